@@ -0,0 +1,142 @@
+"""
+Batch mode for degrees.py.
+
+Reads (source, target) pairs from a JSONL or CSV file and streams one JSON
+result per line, in input order. The graph is loaded once before a pool of
+worker processes is forked, so workers share its memory copy-on-write (and
+a snapshot-backed graph shares the same mapped pages). Sources that repeat
+within a chunk are answered from one cached full BFS tree.
+
+Pairs may name people or give IMDB ids:
+
+    {"source": "Kevin Bacon", "target": "Tom Hanks"}
+    source,target
+    102,158
+
+Usage:
+
+    python batch.py pairs.jsonl [--directory DIR] [--output FILE] [--workers N]
+"""
+
+import argparse
+import collections
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+
+from graph import Graph
+
+# Graph shared with forked workers
+graph = None
+
+# Pairs handed to a worker at a time
+CHUNK_SIZE = 256
+
+
+def read_pairs(path):
+    """Yields (source, target) strings from a JSONL or CSV file."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl") or path.endswith(".json"):
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield str(row["source"]), str(row["target"])
+        else:
+            for row in csv.DictReader(f):
+                yield row["source"], row["target"]
+
+
+def resolve(query):
+    """
+    Returns the IMDB id for an id or a name. A batch cannot ask which
+    person was meant, so ambiguous or misspelled names resolve to the
+    closest match with the most movies. Returns None if nothing matches.
+    """
+    if graph.person_index(query) is not None:
+        return query
+    return graph.names.resolve(query)
+
+
+def answer(pair, shared=False):
+    """
+    Returns the JSON result for one (source, target) pair. If shared,
+    the source is asked about again soon, so a full search tree from it
+    is built instead of a one-off bidirectional search. Cached trees are
+    always reused.
+    """
+    source, target = pair
+    result = {"source": source, "target": target}
+    source_id, target_id = resolve(source), resolve(target)
+    if source_id is None or target_id is None:
+        result["error"] = "Person not found."
+        return result
+    if shared or graph.person_index(source_id) in graph.trees:
+        path = graph.tree(source_id).shortest_path(target_id)
+    else:
+        path = graph.shortest_path(source_id, target_id, bidirectional=True)
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = path
+    return result
+
+
+def answer_chunk(pairs):
+    sources = collections.Counter(source for source, _ in pairs)
+    return [json.dumps(answer(pair, sources[pair[0]] > 1)) for pair in pairs]
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def run(pairs, output, workers=None):
+    """
+    Answers every pair, writing results to output in input order.
+    Returns the number of pairs answered.
+    """
+    count = 0
+    if workers == 1:
+        results = map(answer_chunk, chunks(pairs, CHUNK_SIZE))
+        for lines in results:
+            output.writelines(line + "\n" for line in lines)
+            count += len(lines)
+        return count
+
+    # Fork after loading, so every worker sees the global graph without pickling it
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        for lines in pool.imap(answer_chunk, chunks(pairs, CHUNK_SIZE)):
+            output.writelines(line + "\n" for line in lines)
+            count += len(lines)
+    return count
+
+
+def main():
+    global graph
+    parser = argparse.ArgumentParser(description="Answer degrees of separation for many pairs.")
+    parser.add_argument("pairs", help="JSONL or CSV file with source and target columns")
+    parser.add_argument("--directory", default="large")
+    parser.add_argument("--output", help="file to write JSONL results to (default: stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (1 answers in this process)")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph, _ = Graph.load(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        count = run(read_pairs(args.pairs), output, args.workers)
+    finally:
+        if args.output:
+            output.close()
+    print(f"{count} pairs answered.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Benchmark suite for the Degrees loaders and searches.
+
+Generates a synthetic dataset of configurable size and degree distribution,
+then times each phase in a fresh process so its peak RSS can be reported:
+
+    load-dicts     degrees.load_data into the people/movies/names dicts
+    load-csr       Graph.from_csv, then writing the snapshot
+    open-snapshot  Graph.open on the written snapshot
+    search         BFS, bidirectional BFS and landmark search over pairs at each path
+                   length, plus unreachable pairs
+    lookup         exact, prefix and (best-effort) typo-tolerant name lookups of --pairs
+                   sampled names, the typos one or two random edits away
+
+Results are printed and saved as JSON so runs can be compared.
+
+Usage:
+
+    python benchmark.py [--people N] [--movies N] [--cast N] [--skew S]
+                        [--chain N] [--island N] [--pairs N] [--seed N]
+                        [--directory DIR] [--output FILE]
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+SYLLABLES = ["al", "an", "ar", "be", "da", "el", "en", "ka", "la", "li",
+             "ma", "mi", "na", "no", "ra", "ri", "sa", "ta", "to", "vi"]
+
+
+def synthetic_name(rng):
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return f"{first.title()} {last.title()}"
+
+
+def generate(directory, people=100000, movies=50000, cast=4, skew=1.0,
+             chain=12, island=100, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv to directory.
+
+    Casts average cast people, drawn with Zipf-like popularity (weight of the
+    r-th person is 1 / r ** skew), so a few people star in many movies.
+    A chain of two-person movies hangs off the main component to create
+    long paths, and a separate island of people is never connected to it.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    main_count = people - chain - island
+
+    with open(f"{directory}/people.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people):
+            writer.writerow([i + 1, synthetic_name(rng), rng.randint(1900, 2010)])
+
+    weights = []
+    total = 0.0
+    for rank in range(main_count):
+        total += 1 / (rank + 1) ** skew
+        weights.append(total)
+    # Popularity should not follow id order
+    popular = list(range(main_count))
+    rng.shuffle(popular)
+
+    stars = []
+    movie_count = 0
+
+    def movie(cast_ids):
+        nonlocal movie_count
+        movie_count += 1
+        stars.extend((person + 1, movie_count) for person in cast_ids)
+
+    island_movies = max(1, movies * island // max(people, 1))
+    for _ in range(max(0, movies - chain - island_movies)):
+        size = rng.randint(1, 2 * cast - 1)
+        movie({popular[k] for k in rng.choices(range(main_count), cum_weights=weights, k=size)})
+    # Each chain link co-stars with the previous one only
+    previous = popular[0]
+    for person in range(main_count, main_count + chain):
+        movie({previous, person})
+        previous = person
+    island_ids = range(main_count + chain, people)
+    for _ in range(island_movies):
+        if island_ids:
+            movie(set(rng.sample(island_ids, min(len(island_ids), rng.randint(1, 2 * cast - 1)))))
+
+    with open(f"{directory}/movies.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for j in range(movie_count):
+            writer.writerow([j + 1, f"Movie {j + 1}", rng.randint(1920, 2020)])
+
+    with open(f"{directory}/stars.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        writer.writerows(stars)
+
+    return {"chain": [str(p + 1) for p in [popular[0], *range(main_count, main_count + chain)]],
+            "island": [str(p + 1) for p in island_ids]}
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    value = function(*args)
+    return value, time.perf_counter() - started
+
+
+def bench_load_dicts(directory):
+    import degrees
+    stats, seconds = timed(degrees.load_data, directory)
+    return {"seconds": seconds, "rows": stats.rows,
+            "rows_per_second": stats.rows_per_second(), "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_load_csr(directory):
+    from graph import SNAPSHOT, Graph, fingerprint
+    (graph, stats), seconds = timed(Graph.from_csv, directory)
+    _, save_seconds = timed(graph.save, f"{directory}/{SNAPSHOT}", fingerprint(directory))
+    return {"seconds": seconds, "save_seconds": save_seconds, "rows": stats.rows,
+            "rows_per_second": stats.rows_per_second(), "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_open_snapshot(directory):
+    from graph import SNAPSHOT, Graph, fingerprint
+    graph, seconds = timed(Graph.open, f"{directory}/{SNAPSHOT}", fingerprint(directory))
+    return {"seconds": seconds, "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_search(directory, chain, island, pairs, seed):
+    """Times every search strategy on pairs grouped by path length."""
+    from graph import Graph, SNAPSHOT, fingerprint
+    from landmarks import LandmarkIndex
+
+    rng = random.Random(seed)
+    graph = Graph.open(f"{directory}/{SNAPSHOT}", fingerprint(directory))
+    index, index_seconds = timed(LandmarkIndex.build, graph)
+
+    # Group targets by their distance from a source in the main component
+    source = chain[0]
+    tree = graph.tree(source)
+    by_length = {}
+    for i in range(graph.person_count()):
+        person_id = graph.person_ids[i]
+        degrees = tree.degrees(person_id)
+        if degrees:
+            by_length.setdefault(degrees, []).append(person_id)
+    groups = {str(length): [(source, t) for t in rng.sample(targets, min(pairs, len(targets)))]
+              for length, targets in sorted(by_length.items())}
+    groups["unreachable"] = [(source, t) for t in rng.sample(island, min(pairs, len(island)))]
+
+    strategies = {
+        "bfs": lambda s, t: graph.shortest_path(s, t),
+        "bidirectional": lambda s, t: graph.shortest_path(s, t, bidirectional=True),
+        "alt": index.shortest_path
+    }
+    results = {}
+    for name, strategy in strategies.items():
+        results[name] = {}
+        for group, group_pairs in groups.items():
+            seconds = expanded = 0
+            for s, t in group_pairs:
+                _, elapsed = timed(strategy, s, t)
+                seconds += elapsed
+                expanded += graph.expanded
+            count = max(len(group_pairs), 1)
+            results[name][group] = {"pairs": len(group_pairs),
+                                    "mean_ms": seconds / count * 1000,
+                                    "mean_expanded": expanded / count}
+    return {"landmark_index_seconds": index_seconds, "strategies": results,
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def typo(name, rng):
+    """Returns name with one or two random single-letter edits."""
+    letters = list(name)
+    for _ in range(rng.randint(1, 2)):
+        k = rng.randrange(len(letters))
+        edit = rng.randrange(3)
+        if edit == 0:
+            letters[k] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif edit == 1 and len(letters) > 1:
+            del letters[k]
+        else:
+            letters.insert(k, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+    return "".join(letters)
+
+
+def bench_lookup(directory, pairs, seed):
+    """Times each kind of name lookup on names sampled from the graph."""
+    from graph import Graph, SNAPSHOT, fingerprint
+
+    rng = random.Random(seed)
+    graph = Graph.open(f"{directory}/{SNAPSHOT}", fingerprint(directory))
+    names = [graph.person_names[rng.randrange(graph.person_count())] for _ in range(pairs)]
+    lookups = {
+        "exact": (graph.names.exact, names),
+        "prefix": (graph.names.prefix, [name[:rng.randint(3, 6)] for name in names]),
+        "fuzzy": (graph.names.fuzzy, [typo(name, rng) for name in names])
+    }
+    results = {}
+    for kind, (lookup, queries) in lookups.items():
+        elapsed = [timed(lookup, query)[1] * 1000 for query in queries]
+        results[kind] = {"queries": len(queries),
+                         "mean_ms": sum(elapsed) / max(len(elapsed), 1),
+                         "max_ms": max(elapsed, default=0.0)}
+    return {"lookups": results, "peak_rss_mb": peak_rss_mb()}
+
+
+def isolated(function, *args):
+    """Runs a phase in a fresh process so its peak RSS is its own."""
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(function, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Degrees loaders and searches.")
+    parser.add_argument("--people", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=50000)
+    parser.add_argument("--cast", type=int, default=4, help="mean stars per movie")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of popularity")
+    parser.add_argument("--chain", type=int, default=12, help="length of the long-path chain")
+    parser.add_argument("--island", type=int, default=100, help="people never connected")
+    parser.add_argument("--pairs", type=int, default=20, help="pairs per path length")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory", help="where to write the dataset (default: a temporary one)")
+    parser.add_argument("--output", default="benchmark.json", help="JSON results file")
+    args = parser.parse_args()
+
+    config = {k: v for k, v in vars(args).items() if k not in ("directory", "output")}
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.directory or temporary
+        print(f"Generating {args.people} people and {args.movies} movies...")
+        special, seconds = timed(generate, directory, args.people, args.movies, args.cast,
+                                 args.skew, args.chain, args.island, args.seed)
+        print(f"Generated in {seconds:.2f}s.")
+
+        phases = {}
+        for name, function, phase_args in [
+            ("load-dicts", bench_load_dicts, (directory,)),
+            ("load-csr", bench_load_csr, (directory,)),
+            ("open-snapshot", bench_open_snapshot, (directory,)),
+            ("search", bench_search, (directory, special["chain"], special["island"],
+                                      args.pairs, args.seed)),
+            ("lookup", bench_lookup, (directory, args.pairs, args.seed)),
+        ]:
+            print(f"Running {name}...")
+            phases[name] = isolated(function, *phase_args)
+
+    for name in ("load-dicts", "load-csr", "open-snapshot"):
+        phase = phases[name]
+        print(f"{name:>14}: {phase['seconds'] * 1000:10.1f} ms, "
+              f"peak RSS {phase['peak_rss_mb']:.1f} MiB")
+    for strategy, groups in phases["search"]["strategies"].items():
+        for group, result in groups.items():
+            print(f"{strategy:>14} {group:>11}: {result['mean_ms']:9.3f} ms, "
+                  f"{result['mean_expanded']:10.1f} expanded ({result['pairs']} pairs)")
+    for kind, result in phases["lookup"]["lookups"].items():
+        print(f"{'lookup':>14} {kind:>11}: {result['mean_ms']:9.3f} ms, "
+              f"max {result['max_ms']:.3f} ms ({result['queries']} queries)")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "config": config,
+            "environment": {"python": platform.python_version(),
+                            "platform": platform.platform(),
+                            "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "phases": phases
+        }, f, indent=2)
+    print(f"Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
-import csv
+import argparse
+import math
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+import loader
+from graph import Graph
+from landmarks import LandmarkIndex
+from util import Node, DequeQueueFrontier, DisjointSet
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,65 +17,139 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Maps person_ids to the id of their connected component
+components = {}
 
-def load_data(directory):
+# Compact CSR graph used instead of the dicts above when loaded with csr=True,
+# as main does unless run with --dicts
+graph = None
+
+# Landmark distance oracle over graph, loaded for --estimate and --alt
+landmarks = None
+
+
+def load_data(directory, csr=False):
     """
-    Load data from CSV files into memory. It constructs names, people and movies.
+    Load data from CSV files into memory. It constructs names, people, movies and
+    components, or only the compact graph if csr is True. The graph is cached in a binary
+    snapshot next to the CSV files and rebuilt whenever one of them changes.
+    Returns the LoadStats of parsing the files, or None if the snapshot was used.
     """
+    global graph
+    if csr:
+        graph, stats = Graph.load(directory)
+        return stats
+
+    stats = loader.LoadStats()
+    started = time.perf_counter()
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    for person_id, name, birth in loader.read_rows(
+            f"{directory}/people.csv", ("id", "name", "birth"), stats):
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    for movie_id, title, year in loader.read_rows(
+            f"{directory}/movies.csv", ("id", "title", "year"), stats):
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
+
+    # Load stars, joining each person to the component of their movies
+    disjoint = DisjointSet()
+    for person_id, movie_id in loader.read_rows(
+            f"{directory}/stars.csv", ("person_id", "movie_id"), stats):
+        if person_id not in people or movie_id not in movies:
+            stats.dangling += 1
+            continue
+        people[person_id]["movies"].add(movie_id)
+        movies[movie_id]["stars"].add(person_id)
+        disjoint.union(person_id, ("movie", movie_id))
+    for person_id in people:
+        components[person_id] = disjoint.find(person_id)
+
+    stats.seconds = time.perf_counter() - started
+    return stats
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    global landmarks
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both the source and the target")
+    parser.add_argument("--dicts", action="store_true",
+                        help="load the CSV files into dicts instead of the snapshot-backed graph")
+    parser.add_argument("--estimate", action="store_true",
+                        help="only bound the degrees of separation with the landmark index")
+    parser.add_argument("--alt", action="store_true",
+                        help="search with the landmark index bounding the path length")
+    parser.add_argument("--components", action="store_true",
+                        help="print connected component statistics and exit")
+    parser.add_argument("--histogram", action="store_true",
+                        help="print how many people are at each degree from one person")
+    args = parser.parse_args()
+    directory = args.directory
+    indexed = args.estimate or args.alt
+    if args.dicts and (indexed or args.histogram):
+        parser.error("--estimate, --alt and --histogram need the graph, not --dicts")
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    stats = load_data(directory, csr=not args.dicts)
+    if indexed:
+        landmarks = LandmarkIndex.load(graph, directory)
+        if landmarks is None:
+            sys.exit(f"No landmark index, build it with: python landmarks.py {directory}")
+    print("Data loaded." if stats is None else f"Data loaded: {stats}.")
+
+    if args.components:
+        sizes = component_sizes()
+        print(f"{len(sizes)} connected components.")
+        print(f"Largest: {sizes[0] if sizes else 0} people, "
+              f"isolated: {sizes.count(1)} people.")
+        return
     
     # Get the source and the target
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
+
+    if args.histogram:
+        counts, unreachable = graph.tree(source).histogram()
+        for degree, count in enumerate(counts):
+            print(f"{degree} degrees of separation: {count} people")
+        print(f"Not connected: {unreachable} people")
+        return
+
     target = person_id_for_name(input("Name: "))
     if target is None:
         sys.exit("Person not found.")
 
+    if args.estimate:
+        lower, upper = landmarks.estimate(source, target)
+        if lower == math.inf:
+            print("Not connected.")
+        elif upper == math.inf:
+            print(f"At least {lower} degrees of separation.")
+        else:
+            print(f"Between {lower} and {upper} degrees of separation.")
+        return
+
     # Find solution
-    path = shortest_path(source, target)
+    if args.bidirectional:
+        path = bidirectional_shortest_path(source, target)
+    else:
+        path = shortest_path(source, target)
 
     # If there is no solution:
     if path is None:
@@ -82,9 +161,9 @@ def main():
         # Add the first step, with is from None to the source (Initial State)
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"] # Find the name of the person with id = path[i][1]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"] # Find the title of the movie in which peopla starred in with id = path[i + 1][0]
+            person1 = person_for_id(path[i][1])["name"] # Find the name of the person with id = path[i][1]
+            person2 = person_for_id(path[i + 1][1])["name"]
+            movie = movie_for_id(path[i + 1][0])["title"] # Find the title of the movie in which peopla starred in with id = path[i + 1][0]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
@@ -96,10 +175,18 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
+    if landmarks is not None:
+        return landmarks.shortest_path(source, target)
+    if graph is not None:
+        return graph.shortest_path(source, target)
+
+    # People in different components can never be connected
+    if components[source] != components[target]:
+        return None
     
     # Initialize the frontier to start from the initial state
     start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     frontier.add(start)
     
     # Initialize an empty explored set
@@ -130,18 +217,96 @@ def shortest_path(source, target):
                 child = Node(state=state, parent=node, action=action)
                 frontier.add(child)
 
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, growing one BFS frontier
+    from each end and always expanding the smaller one.
+
+    If no possible path, returns None.
+    """
+    if graph is not None:
+        return graph.shortest_path(source, target, bidirectional=True)
+    if source == target:
+        return []
+    if components[source] != components[target]:
+        return None
+
+    # Nodes reached from the source point back towards the source,
+    # nodes reached from the target point back towards the target
+    forward = {source: Node(state=source, parent=None, action=None)}
+    backward = {target: Node(state=target, parent=None, action=None)}
+    forward_level = [source]
+    backward_level = [target]
+
+    while forward_level and backward_level:
+        # Expand a whole level of the smaller side, so the first meeting is a shortest one
+        if len(forward_level) <= len(backward_level):
+            forward_level, meeting = expand_level(forward_level, forward, backward)
+        else:
+            backward_level, meeting = expand_level(backward_level, backward, forward)
+        if meeting is not None:
+            return join_paths(forward[meeting], backward[meeting])
+    return None
+
+
+def expand_level(level, visited, other):
+    """
+    Expands every person in level, recording new people in visited.
+    Returns the next level and a person already reached by the other side, if any.
+    """
+    next_level = []
+    for state in level:
+        node = visited[state]
+        for action, neighbor in neighbors_for_person(state):
+            if neighbor in visited:
+                continue
+            visited[neighbor] = Node(state=neighbor, parent=node, action=action)
+            if neighbor in other:
+                return next_level, neighbor
+            next_level.append(neighbor)
+    return next_level, None
+
+
+def join_paths(forward_node, backward_node):
+    """
+    Joins the source-side chain ending at forward_node with the
+    target-side chain starting at backward_node into one path.
+    """
+    solution = []
+    node = forward_node
+    while node.parent is not None:
+        solution.append((node.action, node.state))
+        node = node.parent
+    solution.reverse()
+
+    # Walking the target side means stepping to the parent through the shared movie
+    node = backward_node
+    while node.parent is not None:
+        solution.append((node.action, node.parent.state))
+        node = node.parent
+    return solution
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = graph.person_ids_for_name(name)
+    else:
+        person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        if graph is not None:
+            suggestions = [candidate["name"] for candidate in graph.names.candidates(name, 5)]
+            if suggestions:
+                print(f"Did you mean: {', '.join(suggestions)}?")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_for_id(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -156,11 +321,39 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def component_sizes():
+    """
+    Returns the size of every connected component, largest first.
+    """
+    if graph is not None:
+        return graph.component_sizes()
+    sizes = {}
+    for component in components.values():
+        sizes[component] = sizes.get(component, 0) + 1
+    return sorted(sizes.values(), reverse=True)
+
+
+def person_for_id(person_id):
+    """
+    Returns the name and birth of a person.
+    """
+    return graph.person(person_id) if graph is not None else people[person_id]
+
+
+def movie_for_id(movie_id):
+    """
+    Returns the title and year of a movie.
+    """
+    return graph.movie(movie_id) if graph is not None else movies[movie_id]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
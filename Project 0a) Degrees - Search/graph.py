@@ -0,0 +1,673 @@
+"""
+Compact graph of people and movies for degrees.py.
+
+IMDB ids are mapped to dense integers and the bipartite person <-> movie
+graph is stored as CSR arrays: the movies of person i are
+person_movies[person_offsets[i]:person_offsets[i + 1]], and the stars of
+movie j are movie_people[movie_offsets[j]:movie_offsets[j + 1]].
+
+A built graph is cached in a binary snapshot next to the CSV files, which
+later runs memory-map instead of parsing text.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+import loader
+from nameindex import NameIndex, build_rank_tree, build_trigrams, normalize
+
+# Typecode of every integer array in the graph
+INDEX = "i"
+
+# Distance recorded for people that a search never reaches
+UNREACHABLE = 255
+
+# Number of single-source search trees Graph.tree keeps
+TREE_CACHE_SIZE = 8
+
+# Snapshot file written next to the CSV files
+SNAPSHOT = "graph.snapshot"
+
+# Bump whenever the snapshot layout or the graph contents change
+SNAPSHOT_VERSION = 5
+
+# Snapshots and landmark indexes start with magic bytes, a version and the
+# length of a JSON header, which lays out the binary sections after it
+MAGIC = b"DEGREES\0"
+PREFIX = struct.Struct("<8sII")
+
+# Attributes stored in a snapshot, in the order Graph.__init__ takes them
+TABLES = ("person_ids", "person_names", "person_births",
+          "movie_ids", "movie_titles", "movie_years", "trigrams")
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_people",
+          "person_order", "movie_order", "name_order", "components",
+          "trigram_offsets", "trigram_postings", "name_lengths", "name_tree")
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus offsets,
+    which costs a few bytes per string instead of a Python object each.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        data = bytearray()
+        offsets = array(INDEX, [0])
+        for s in strings:
+            data += s.encode("utf-8")
+            offsets.append(len(data))
+        return cls(bytes(data), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+def fingerprint(directory):
+    """Returns the size and modification time of each CSV file."""
+    stats = {}
+    for filename in ("people.csv", "movies.csv", "stars.csv"):
+        stat = os.stat(f"{directory}/{filename}")
+        stats[filename] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def csr(sources, targets, count):
+    """
+    Groups the edges sources[k] -> targets[k] by source.
+    Returns the offsets and indices arrays of the CSR layout.
+    """
+    offsets = array(INDEX, bytes(array(INDEX).itemsize * (count + 1)))
+    for s in sources:
+        offsets[s + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    cursor = array(INDEX, offsets[:-1])
+    indices = array(INDEX, bytes(array(INDEX).itemsize * len(targets)))
+    for s, t in zip(sources, targets):
+        indices[cursor[s]] = t
+        cursor[s] += 1
+    return offsets, indices
+
+
+def label_components(movie_offsets, movie_people, count):
+    """
+    Unions the stars of every movie and returns the dense component
+    id of each person, numbered in order of first appearance.
+    """
+    parent = array(INDEX, range(count))
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        # Compress the path so later finds are near O(1)
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    for movie in range(len(movie_offsets) - 1):
+        start, end = movie_offsets[movie], movie_offsets[movie + 1]
+        if end - start < 2:
+            continue
+        root = find(movie_people[start])
+        for j in range(start + 1, end):
+            other = find(movie_people[j])
+            if other != root:
+                parent[other] = root
+
+    labels = array(INDEX, [-1]) * count
+    components = array(INDEX, bytes(array(INDEX).itemsize * count))
+    next_label = 0
+    for i in range(count):
+        root = find(i)
+        if labels[root] == -1:
+            labels[root] = next_label
+            next_label += 1
+        components[i] = labels[root]
+    return components
+
+
+def open_sections(path, magic, version, **expected):
+    """
+    Memory-maps a file written by save_sections. Returns the mapping, its
+    JSON header and a memoryview of each section by name, or None if the
+    file is missing, has other magic bytes or version, or a header value
+    differs from the expected keyword arguments.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        found, found_version, length = PREFIX.unpack_from(mapping)
+        header = json.loads(mapping[PREFIX.size:PREFIX.size + length])
+    except (struct.error, ValueError):
+        found = None
+    if (found != magic or found_version != version
+            or any(header.get(key) != value for key, value in expected.items())):
+        mapping.close()
+        return None
+    view = memoryview(mapping)
+    sections = {name: view[start:start + size]
+                for name, (start, size) in header["sections"].items()}
+    return mapping, header, sections
+
+
+def save_sections(path, magic, version, header, sections):
+    """
+    Writes the JSON header and the (name, bytes) sections to path, each
+    section aligned to 8 bytes. The file is written aside and renamed,
+    so readers never see a partial one.
+    """
+    header = dict(header, sections={})
+    encoded = b""
+    while True:
+        start = PREFIX.size + len(encoded)
+        for name, data in sections:
+            start += -start % 8
+            header["sections"][name] = [start, len(data)]
+            start += len(data)
+        layout = json.dumps(header).encode("utf-8")
+        if len(layout) == len(encoded):
+            encoded = layout
+            break
+        encoded = layout
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREFIX.pack(magic, version, len(encoded)))
+        f.write(encoded)
+        for name, data in sections:
+            f.write(bytes(header["sections"][name][0] - f.tell()))
+            f.write(data)
+    os.replace(temporary, path)
+
+
+def sorted_order(table, key=None):
+    """Returns the indices of table sorted by their (keyed) strings."""
+    if key is None:
+        return array(INDEX, sorted(range(len(table)), key=table.__getitem__))
+    return array(INDEX, sorted(range(len(table)), key=lambda i: key(table[i])))
+
+
+class Graph():
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_order, movie_order, name_order, components,
+                 trigrams, trigram_offsets, trigram_postings, name_lengths, name_tree):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Indices sorted by IMDB id and by normalized name, searched by bisection
+        self.person_order = person_order
+        self.movie_order = movie_order
+        self.name_order = name_order
+        # Segment tree over name_order ranking people by movies, for nameindex
+        self.name_tree = name_tree
+
+        # Connected component id of each person, so unreachable pairs fail fast
+        self.components = components
+
+        # Sorted name trigrams and the people whose names contain each, and the
+        # length of each person's normalized name, for nameindex
+        self.trigrams = trigrams
+        self.trigram_offsets = trigram_offsets
+        self.trigram_postings = trigram_postings
+        self.name_lengths = name_lengths
+        self.names = NameIndex(self)
+
+        # Memory map backing the arrays when opened from a snapshot
+        self.mapping = None
+
+        # Recently used single-source search trees, least recent first
+        self.trees = OrderedDict()
+
+        # Number of people the last search expanded
+        self.expanded = 0
+
+    @classmethod
+    def load(cls, directory, workers=None):
+        """
+        Opens the snapshot in directory if it matches the CSV files,
+        otherwise builds the graph from them and writes a new snapshot.
+        Returns the graph and the LoadStats of parsing, or None if the
+        snapshot was used.
+        """
+        path = f"{directory}/{SNAPSHOT}"
+        stats = fingerprint(directory)
+        graph = cls.open(path, stats)
+        if graph is not None:
+            return graph, None
+        graph, load_stats = cls.from_csv(directory, workers)
+        try:
+            graph.save(path, stats)
+        except OSError:
+            # A read-only data directory only costs the cache
+            pass
+        return graph, load_stats
+
+    @classmethod
+    def open(cls, path, stats):
+        """
+        Memory-maps a snapshot, or returns None if it is missing,
+        from another version or stale with respect to stats.
+        """
+        opened = open_sections(path, MAGIC, SNAPSHOT_VERSION,
+                               byteorder=sys.byteorder, fingerprint=stats)
+        if opened is None:
+            return None
+        mapping, _, sections = opened
+        fields = {name: StringTable(sections[f"{name}.blob"],
+                                    sections[f"{name}.offsets"].cast(INDEX))
+                  for name in TABLES}
+        for name in ARRAYS:
+            fields[name] = sections[name].cast(INDEX)
+        graph = cls(**fields)
+        graph.mapping = mapping
+        return graph
+
+    def save(self, path, stats):
+        """
+        Writes the graph to a snapshot tagged with stats. The file is
+        written aside and renamed, so readers never see a partial one.
+        """
+        sections = []
+        for name in TABLES:
+            table = getattr(self, name)
+            sections.append((f"{name}.blob", bytes(table.blob)))
+            sections.append((f"{name}.offsets", bytes(table.offsets)))
+        for name in ARRAYS:
+            sections.append((name, bytes(getattr(self, name))))
+        save_sections(path, MAGIC, SNAPSHOT_VERSION,
+                      {"byteorder": sys.byteorder, "fingerprint": stats}, sections)
+
+    @classmethod
+    def from_csv(cls, directory, workers=None):
+        """
+        Builds the graph straight from the CSV files, without the
+        dicts of sets that degrees.load_data constructs. Returns the
+        graph and the LoadStats of reading the files.
+        """
+        people, movies, stars, stats = loader.load(directory, workers)
+        return cls.from_edges(*people, *movies, *stars), stats
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """Builds the graph from the people and movies dicts of degrees.py."""
+        person_ids = list(people)
+        movie_ids = list(movies)
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        star_people, star_movies = array(INDEX), array(INDEX)
+        for i, person_id in enumerate(person_ids):
+            for movie_id in people[person_id]["movies"]:
+                star_people.append(i)
+                star_movies.append(movie_index[movie_id])
+        return cls.from_edges(
+            person_ids,
+            [people[person_id]["name"] for person_id in person_ids],
+            [people[person_id]["birth"] for person_id in person_ids],
+            movie_ids,
+            [movies[movie_id]["title"] for movie_id in movie_ids],
+            [movies[movie_id]["year"] for movie_id in movie_ids],
+            star_people, star_movies
+        )
+
+    @classmethod
+    def from_edges(cls, person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years, star_people, star_movies):
+        """
+        Builds the graph from per-person and per-movie columns and
+        the (person index, movie index) pairs of stars.csv.
+        """
+        person_offsets, person_movies = csr(star_people, star_movies, len(person_ids))
+        movie_offsets, movie_people = csr(star_movies, star_people, len(movie_ids))
+
+        person_ids = StringTable.from_strings(person_ids)
+        person_names = StringTable.from_strings(person_names)
+        movie_ids = StringTable.from_strings(movie_ids)
+        trigrams, trigram_offsets, trigram_postings, name_lengths = build_trigrams(person_names)
+        name_order = sorted_order(person_names, key=normalize)
+        return cls(
+            person_ids, person_names, StringTable.from_strings(person_births),
+            movie_ids, StringTable.from_strings(movie_titles),
+            StringTable.from_strings(movie_years),
+            person_offsets, person_movies, movie_offsets, movie_people,
+            sorted_order(person_ids), sorted_order(movie_ids),
+            name_order,
+            label_components(movie_offsets, movie_people, len(person_ids)),
+            StringTable.from_strings(trigrams), trigram_offsets, trigram_postings, name_lengths,
+            build_rank_tree(name_order, person_offsets)
+        )
+
+    def person_count(self):
+        return len(self.person_offsets) - 1
+
+    def movie_count(self):
+        return len(self.movie_offsets) - 1
+
+    def connected(self, s, t):
+        """Returns whether person indices s and t are in the same component."""
+        return self.components[s] == self.components[t]
+
+    def component_sizes(self):
+        """Returns the size of every connected component, largest first."""
+        sizes = array(INDEX, bytes(array(INDEX).itemsize * self.person_count()))
+        for component in self.components:
+            sizes[component] += 1
+        return sorted((size for size in sizes if size), reverse=True)
+
+    def person_index(self, person_id):
+        """Returns the dense index of an IMDB person id, or None."""
+        return self.find(self.person_order, self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """Returns the dense index of an IMDB movie id, or None."""
+        return self.find(self.movie_order, self.movie_ids, movie_id)
+
+    @staticmethod
+    def find(order, table, value):
+        """Returns the index in order whose string equals value, or None."""
+        k = bisect_left(order, value, key=table.__getitem__)
+        if k < len(order) and table[order[k]] == value:
+            return order[k]
+        return None
+
+    def person_ids_for_name(self, name):
+        """Returns the IMDB ids of every person with the given name, most movies first."""
+        return [self.person_ids[i] for i in self.names.exact(name)]
+
+    def person(self, person_id):
+        """Returns the name and birth of a person, like degrees.people."""
+        i = self.person_index(person_id)
+        return {"name": self.person_names[i], "birth": self.person_births[i]}
+
+    def movie(self, movie_id):
+        """Returns the title and year of a movie, like degrees.movies."""
+        i = self.movie_index(movie_id)
+        return {"title": self.movie_titles[i], "year": self.movie_years[i]}
+
+    def neighbors(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        i = self.person_index(person_id)
+        neighbors = set()
+        for k in range(self.person_offsets[i], self.person_offsets[i + 1]):
+            movie = self.person_movies[k]
+            for j in range(self.movie_offsets[movie], self.movie_offsets[movie + 1]):
+                neighbors.add((self.movie_ids[movie], self.person_ids[self.movie_people[j]]))
+        return neighbors
+
+    def shortest_path(self, source, target, bidirectional=False):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        self.expanded = 0
+        s = self.person_index(source)
+        t = self.person_index(target)
+        if s is None or t is None:
+            return None
+        if s == t:
+            return []
+        if not self.connected(s, t):
+            return None
+        if bidirectional:
+            return self.bidirectional_search(s, t)
+        return self.search(s, t)
+
+    def search(self, s, t):
+        """BFS from s to t over dense indices."""
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        # parent[i] is the person before i on the path, via the movie via[i]
+        parent = array(INDEX, [-1]) * self.person_count()
+        via = array(INDEX, [-1]) * self.person_count()
+        # A movie only needs expanding the first time it is reached
+        seen = bytearray(self.movie_count())
+        parent[s] = s
+
+        queue = array(INDEX, [s])
+        head = 0
+        while head < len(queue):
+            person = queue[head]
+            head += 1
+            for k in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[k]
+                if seen[movie]:
+                    continue
+                seen[movie] = 1
+                for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    star = movie_people[j]
+                    if parent[star] == -1:
+                        parent[star] = person
+                        via[star] = movie
+                        if star == t:
+                            self.expanded = head
+                            return self.path(t, parent, via)
+                        queue.append(star)
+        self.expanded = head
+        return None
+
+    def tree(self, source):
+        """
+        Returns the SearchTree of a full BFS from an IMDB id, reusing
+        one of the TREE_CACHE_SIZE most recently used sources if possible.
+
+        If the id is unknown, returns None.
+        """
+        s = self.person_index(source)
+        if s is None:
+            return None
+        if s in self.trees:
+            self.trees.move_to_end(s)
+            return self.trees[s]
+
+        parent = array(INDEX, [-1]) * self.person_count()
+        via = array(INDEX, [-1]) * self.person_count()
+        distance = bytearray([UNREACHABLE]) * self.person_count()
+        seen = bytearray(self.movie_count())
+        parent[s] = s
+        distance[s] = 0
+        queue = array(INDEX, [s])
+        head = 0
+        while head < len(queue):
+            person = queue[head]
+            head += 1
+            depth = min(distance[person] + 1, UNREACHABLE - 1)
+            for k in range(self.person_offsets[person], self.person_offsets[person + 1]):
+                movie = self.person_movies[k]
+                if seen[movie]:
+                    continue
+                seen[movie] = 1
+                for j in range(self.movie_offsets[movie], self.movie_offsets[movie + 1]):
+                    star = self.movie_people[j]
+                    if parent[star] == -1:
+                        parent[star] = person
+                        via[star] = movie
+                        distance[star] = depth
+                        queue.append(star)
+
+        tree = SearchTree(self, s, parent, via, distance)
+        self.trees[s] = tree
+        if len(self.trees) > TREE_CACHE_SIZE:
+            self.trees.popitem(last=False)
+        return tree
+
+    def distances(self, s):
+        """
+        Returns the degrees of separation from s to every person,
+        UNREACHABLE for people in another component.
+        """
+        distance = bytearray([UNREACHABLE]) * self.person_count()
+        seen = bytearray(self.movie_count())
+        distance[s] = 0
+        level = [s]
+        depth = 0
+        while level:
+            depth = min(depth + 1, UNREACHABLE - 1)
+            next_level = []
+            for person in level:
+                for k in range(self.person_offsets[person], self.person_offsets[person + 1]):
+                    movie = self.person_movies[k]
+                    if seen[movie]:
+                        continue
+                    seen[movie] = 1
+                    for j in range(self.movie_offsets[movie], self.movie_offsets[movie + 1]):
+                        star = self.movie_people[j]
+                        if distance[star] == UNREACHABLE:
+                            distance[star] = depth
+                            next_level.append(star)
+            level = next_level
+        return distance
+
+    def co_stars(self, person):
+        """Yields (movie, person) index pairs for everyone who starred with person."""
+        for k in range(self.person_offsets[person], self.person_offsets[person + 1]):
+            movie = self.person_movies[k]
+            for j in range(self.movie_offsets[movie], self.movie_offsets[movie + 1]):
+                yield movie, self.movie_people[j]
+
+    def bidirectional_search(self, s, t, limit=None):
+        """
+        BFS from both s and t, always expanding the smaller level.
+
+        If limit is given, gives up and returns None as soon as the levels
+        show that s and t are more than limit degrees apart.
+        """
+        n = self.person_count()
+        sides = []
+        for root in (s, t):
+            parent = array(INDEX, [-1]) * n
+            parent[root] = root
+            sides.append((parent, array(INDEX, [-1]) * n, bytearray(self.movie_count())))
+        levels = [array(INDEX, [s]), array(INDEX, [t])]
+        # Without a meeting, every path is longer than the depths of both levels together
+        depths = [0, 0]
+
+        while levels[0] and levels[1]:
+            if limit is not None and depths[0] + depths[1] >= limit:
+                return None
+            side = 0 if len(levels[0]) <= len(levels[1]) else 1
+            depths[side] += 1
+            levels[side], meeting = self.expand_level(levels[side], sides[side], sides[1 - side][0])
+            if meeting is not None:
+                forward, backward = sides
+                solution = self.path(meeting, forward[0], forward[1])
+                # Walking the target side means stepping to the parent through the shared movie
+                person = meeting
+                while backward[0][person] != person:
+                    solution.append((self.movie_ids[backward[1][person]],
+                                     self.person_ids[backward[0][person]]))
+                    person = backward[0][person]
+                return solution
+        return None
+
+    def expand_level(self, level, side, other):
+        """
+        Expands every person in level for one side of a bidirectional search.
+        Returns the next level and a person already reached by the other side, if any.
+        """
+        parent, via, seen = side
+        next_level = array(INDEX)
+        for person in level:
+            self.expanded += 1
+            for k in range(self.person_offsets[person], self.person_offsets[person + 1]):
+                movie = self.person_movies[k]
+                if seen[movie]:
+                    continue
+                seen[movie] = 1
+                for j in range(self.movie_offsets[movie], self.movie_offsets[movie + 1]):
+                    star = self.movie_people[j]
+                    if parent[star] != -1:
+                        continue
+                    parent[star] = person
+                    via[star] = movie
+                    if other[star] != -1:
+                        return next_level, star
+                    next_level.append(star)
+        return next_level, None
+
+    def path(self, person, parent, via):
+        """Follows parent pointers back from person to the root of the search."""
+        solution = []
+        while parent[person] != person:
+            solution.append((self.movie_ids[via[person]], self.person_ids[person]))
+            person = parent[person]
+        solution.reverse()
+        return solution
+
+
+class SearchTree():
+    """
+    Parents and distances of a full BFS from one source, which answer
+    the path to any target in O(path length).
+    """
+
+    def __init__(self, graph, source, parent, via, distance):
+        self.graph = graph
+        self.source = source
+        self.parent = parent
+        self.via = via
+        self.distance = distance
+
+    def degrees(self, target):
+        """Returns the degrees of separation to an IMDB id, or None if not connected."""
+        t = self.graph.person_index(target)
+        if t is None or self.distance[t] == UNREACHABLE:
+            return None
+        return self.distance[t]
+
+    def shortest_path(self, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        t = self.graph.person_index(target)
+        if t is None or self.parent[t] == -1:
+            return None
+        return self.graph.path(t, self.parent, self.via)
+
+    def histogram(self):
+        """
+        Returns how many people are at each degree of separation, indexed by
+        degree, and how many people cannot be reached at all.
+        """
+        counts = [0] * (UNREACHABLE + 1)
+        for d in self.distance:
+            counts[d] += 1
+        unreachable = counts.pop()
+        while counts and not counts[-1]:
+            counts.pop()
+        return counts, unreachable
@@ -0,0 +1,176 @@
+"""
+Landmark distance oracle for degrees.py.
+
+A BFS from each of a few high-degree landmark people records their degrees
+of separation to everyone. By the triangle inequality, for any landmark L
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+so the index bounds d(s, t) in O(#landmarks). The landmark giving the
+upper bound also gives a path of that length, found by walking down its
+distances, so an exact search only has to rule out shorter paths: not at
+all when the bounds meet, otherwise with a bidirectional BFS that stops one
+level short of the upper bound instead of expanding its largest level.
+
+Build the index once with:
+
+    python landmarks.py [directory] [--count N]
+"""
+
+import argparse
+import math
+from array import array
+
+from graph import Graph, INDEX, UNREACHABLE, fingerprint, open_sections, save_sections
+
+# Index file written next to the CSV files
+LANDMARKS = "landmarks.index"
+
+# Bump whenever the index layout changes
+LANDMARKS_VERSION = 2
+
+# Magic bytes of the index, laid out like a graph snapshot
+MAGIC = b"LANDMARK"
+
+
+class LandmarkIndex():
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        # Person indices of the landmarks
+        self.landmarks = landmarks
+        # distances[l * n + v] is the degrees of separation from landmark l to person v
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """Runs a BFS from each of the count people with the most movies."""
+        n = graph.person_count()
+        by_degree = sorted(
+            range(n),
+            key=lambda i: graph.person_offsets[i + 1] - graph.person_offsets[i],
+            reverse=True
+        )
+        landmarks = array(INDEX, by_degree[:count])
+        distances = bytearray()
+        for landmark in landmarks:
+            distances += graph.distances(landmark)
+        return cls(graph, landmarks, distances)
+
+    @classmethod
+    def load(cls, graph, directory):
+        """
+        Opens the index in directory, or returns None if it is missing,
+        from another version or built from different CSV files.
+        """
+        opened = open_sections(f"{directory}/{LANDMARKS}", MAGIC, LANDMARKS_VERSION,
+                               fingerprint=fingerprint(directory))
+        if opened is None:
+            return None
+        _, header, sections = opened
+        return cls(graph, array(INDEX, header["landmarks"]), sections["distances"])
+
+    def save(self, directory):
+        """Writes the index next to the CSV files it was built from."""
+        header = {"fingerprint": fingerprint(directory), "landmarks": list(self.landmarks)}
+        save_sections(f"{directory}/{LANDMARKS}", MAGIC, LANDMARKS_VERSION, header,
+                      [("distances", self.distances)])
+
+    def bounds(self, s, t):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        person indices s and t. Both are math.inf if a landmark reaches
+        only one of them, since they then lie in different components.
+        """
+        n = self.graph.person_count()
+        lower, upper = 0, math.inf
+        for l in range(len(self.landmarks)):
+            ds = self.distances[l * n + s]
+            dt = self.distances[l * n + t]
+            if ds == UNREACHABLE and dt == UNREACHABLE:
+                continue
+            if ds == UNREACHABLE or dt == UNREACHABLE:
+                return math.inf, math.inf
+            lower = max(lower, abs(ds - dt))
+            upper = min(upper, ds + dt)
+        if s != t:
+            lower = max(lower, 1)
+        return lower, upper
+
+    def estimate(self, source, target):
+        """Returns bounds on the degrees of separation between two IMDB ids."""
+        s = self.graph.person_index(source)
+        t = self.graph.person_index(target)
+        if not self.graph.connected(s, t):
+            return math.inf, math.inf
+        return self.bounds(s, t)
+
+    def descend(self, l, person):
+        """
+        Returns the (movie, person) index steps of a shortest path from
+        person to landmark l, found by always stepping to a co-star one
+        degree closer to the landmark.
+        """
+        row = l * self.graph.person_count()
+        steps = []
+        while self.distances[row + person] > 0:
+            closer = self.distances[row + person] - 1
+            steps.append(next((movie, star) for movie, star in self.graph.co_stars(person)
+                              if self.distances[row + star] == closer))
+            person = steps[-1][1]
+        return steps
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect the source to the target.
+
+        The landmark giving the upper bound lies on a path of that length,
+        which is returned as soon as the lower bound, or a bidirectional
+        BFS that stops short of that length, shows nothing shorter exists.
+
+        If no possible path, returns None.
+        """
+        graph = self.graph
+        graph.expanded = 0
+        s = graph.person_index(source)
+        t = graph.person_index(target)
+        if s is None or t is None or not graph.connected(s, t):
+            return None
+        if s == t:
+            return []
+        lower, upper = self.bounds(s, t)
+        if upper == math.inf:
+            # No landmark reaches this component
+            return graph.bidirectional_search(s, t)
+        if lower < upper:
+            path = graph.bidirectional_search(s, t, upper - 1)
+            if path is not None:
+                return path
+
+        n = graph.person_count()
+        l = min(range(len(self.landmarks)),
+                key=lambda l: self.distances[l * n + s] + self.distances[l * n + t])
+        # Walking from the landmark to t retraces the steps from t, moving each movie back one
+        to_landmark, to_target = self.descend(l, s), self.descend(l, t)
+        people = [t] + [person for _, person in to_target]
+        steps = to_landmark + [(movie, people[k]) for k, (movie, _) in enumerate(to_target)][::-1]
+        return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in steps]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the landmark index for a dataset.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--count", type=int, default=16, help="number of landmarks")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    graph, _ = Graph.load(args.directory)
+    print(f"Running BFS from {min(args.count, graph.person_count())} landmarks...")
+    index = LandmarkIndex.build(graph, args.count)
+    index.save(args.directory)
+    print(f"Index written to {args.directory}/{LANDMARKS}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Name index for the compact Degrees graph.
+
+Exact and prefix lookups bisect the people sorted by normalized name, and
+a prefix's best known people come from a segment tree over that order
+holding the position with the most movies in each range, so both take
+O(log n) steps whatever the prefix (O(limit log n) to rank a prefix).
+
+Typo-tolerant lookups are best-effort: they read postings whose length
+grows with the number of names, so unlike exact and prefix lookups they
+are not bounded in time, and candidates only falls back to them when
+neither finds anyone. They use trigram postings: one edit changes at most three
+trigrams of a name, so any name within k edits of the query has a length
+within k of it and shares at least t - 3k of the query's t trigrams, which
+puts it in one of the 3k + 1 rarest postings. Those postings give the
+candidates. A candidate of the wrong length is dropped before its other
+trigrams are counted, by bisecting the common postings; the rest are pruned
+by that bound, and at most FUZZY_CANDIDATES sharing the most trigrams are
+verified by edit distance.
+
+Candidates are ranked by number of movies, so the best known person with
+a name comes first and can be picked without asking.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+
+# Postings entries a typo-tolerant lookup reads beyond the 3k + 1 it must read;
+# postings not read are searched by bisection for each candidate instead
+POSTINGS_BUDGET = 20000
+
+# Candidates a typo-tolerant lookup verifies by edit distance at most
+FUZZY_CANDIDATES = 2000
+
+
+def normalize(name):
+    """Lower-cases a name and collapses its whitespace."""
+    return " ".join(name.lower().split())
+
+
+def trigrams(name):
+    """Returns the distinct trigrams of a normalized name, padded at both ends."""
+    padded = f"${name}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_trigrams(names):
+    """
+    Builds trigram postings for a sequence of names. Returns the sorted
+    trigrams, offsets and postings arrays such that the people with
+    trigram k are postings[offsets[k]:offsets[k + 1]], in index order,
+    and the length of every normalized name.
+    """
+    postings = {}
+    lengths = array("i")
+    for i in range(len(names)):
+        name = normalize(names[i])
+        lengths.append(len(name))
+        for trigram in trigrams(name):
+            postings.setdefault(trigram, array("i")).append(i)
+    keys = sorted(postings)
+    offsets = array("i", [0])
+    flat = array("i")
+    for key in keys:
+        flat += postings[key]
+        offsets.append(len(flat))
+    return keys, offsets, flat, lengths
+
+
+def build_rank_tree(order, person_offsets):
+    """
+    Builds a bottom-up segment tree over the positions of order: leaf
+    tree[n + p] is position p, and every other node holds whichever of its
+    children's positions has the person with the most movies, the earlier
+    position on ties.
+    """
+    n = len(order)
+    movies = [person_offsets[i + 1] - person_offsets[i] for i in order]
+    tree = array("i", [0]) * n + array("i", range(n))
+    for node in range(n - 1, 0, -1):
+        left, right = tree[2 * node], tree[2 * node + 1]
+        if (movies[right], -right) > (movies[left], -left):
+            left = right
+        tree[node] = left
+    return tree
+
+
+def edit_distance(a, b, limit):
+    """Returns the Levenshtein distance of a and b, or limit + 1 if it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (x != y)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class NameIndex():
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def movies(self, i):
+        """Returns how many movies person index i starred in."""
+        return self.graph.person_offsets[i + 1] - self.graph.person_offsets[i]
+
+    def key(self, i):
+        return normalize(self.graph.person_names[i])
+
+    def candidate(self, i, match, distance=None):
+        """
+        Describes person i as a match of kind "exact", "prefix" or "fuzzy",
+        with its edit distance from the query unless it is a prefix match.
+        """
+        graph = self.graph
+        return {
+            "id": graph.person_ids[i],
+            "name": graph.person_names[i],
+            "birth": graph.person_births[i],
+            "movies": self.movies(i),
+            "match": match,
+            "distance": distance
+        }
+
+    def span(self, prefix):
+        """Returns the range of positions in name_order whose names start with prefix."""
+        order = self.graph.name_order
+        start = bisect_left(order, prefix, key=self.key)
+        end = bisect_left(order, prefix + "\U0010ffff", lo=start, key=self.key)
+        return start, end
+
+    def exact(self, name):
+        """Returns the indices of everyone with the name, most movies first."""
+        name = normalize(name)
+        order = self.graph.name_order
+        k = bisect_left(order, name, key=self.key)
+        matches = []
+        while k < len(order) and self.key(order[k]) == name:
+            matches.append(order[k])
+            k += 1
+        return sorted(matches, key=self.movies, reverse=True)
+
+    def best(self, start, end):
+        """Returns the position in name_order[start:end] of the person with the most movies."""
+        graph = self.graph
+        tree, order = graph.name_tree, graph.name_order
+        best, most = -1, -1
+        start += len(order)
+        end += len(order)
+        while start < end:
+            if start & 1:
+                candidates = (tree[start],)
+                start += 1
+            else:
+                candidates = ()
+            if end & 1:
+                end -= 1
+                candidates += (tree[end],)
+            for k in candidates:
+                movies = self.movies(order[k])
+                if movies > most or (movies == most and k < best):
+                    best, most = k, movies
+            start >>= 1
+            end >>= 1
+        return best
+
+    def rank_prefix(self, prefix, limit):
+        """
+        Returns the indices of up to limit people whose names start with
+        prefix, most movies first: the best of the span is taken, and the
+        ranges on either side of it are searched next.
+        """
+        order = self.graph.name_order
+        ranges = []
+
+        def push(start, end):
+            if start < end:
+                k = self.best(start, end)
+                heapq.heappush(ranges, (-self.movies(order[k]), k, start, end))
+
+        push(*self.span(prefix))
+        matches = []
+        while ranges and len(matches) < limit:
+            _, k, start, end = heapq.heappop(ranges)
+            matches.append(order[k])
+            push(start, k)
+            push(k + 1, end)
+        return matches
+
+    def prefix(self, prefix, limit=10):
+        """Returns up to limit candidates whose names start with prefix, most movies first."""
+        return [self.candidate(i, "prefix") for i in self.rank_prefix(normalize(prefix), limit)]
+
+    def postings(self, trigram):
+        graph = self.graph
+        k = bisect_left(graph.trigrams, trigram)
+        if k == len(graph.trigrams) or graph.trigrams[k] != trigram:
+            return ()
+        return graph.trigram_postings[graph.trigram_offsets[k]:graph.trigram_offsets[k + 1]]
+
+    def fuzzy(self, name, max_edits=2, limit=10):
+        """
+        Returns up to limit candidates within max_edits edits of name,
+        closest first and then most movies first. Best-effort: the time
+        taken grows with the number of names sharing the name's trigrams.
+        """
+        name = normalize(name)
+        lists = sorted((self.postings(trigram) for trigram in trigrams(name)), key=len)
+
+        # Names within max_edits lose at most 3 * max_edits of the query's trigrams,
+        # so every match is in one of the rarest len(lists) - needed + 1 postings
+        needed = max(1, len(lists) - 3 * max_edits)
+        m = len(lists) - needed + 1
+        total = sum(len(postings) for postings in lists[:m])
+        while m < len(lists) and total + len(lists[m]) <= POSTINGS_BUDGET:
+            total += len(lists[m])
+            m += 1
+        counts = Counter(chain.from_iterable(lists[:m]))
+
+        # A match in count of the m postings read needs needed - count of the others
+        lengths = self.graph.name_lengths
+        shortest, longest = len(name) - max_edits, len(name) + max_edits
+        unread = lists[m:]
+        survivors = []
+        for i, count in counts.items():
+            if not shortest <= lengths[i] <= longest or count + len(unread) < needed:
+                continue
+            for k, postings in enumerate(unread):
+                if count >= needed or count + len(unread) - k < needed:
+                    break
+                position = bisect_left(postings, i)
+                if position < len(postings) and postings[position] == i:
+                    count += 1
+            if count >= needed:
+                survivors.append((count, self.movies(i), i))
+
+        matches = []
+        for _, _, i in heapq.nlargest(FUZZY_CANDIDATES, survivors):
+            distance = edit_distance(name, self.key(i), max_edits)
+            if distance <= max_edits:
+                matches.append((distance, -self.movies(i), i))
+        return [self.candidate(i, "fuzzy", distance)
+                for distance, _, i in heapq.nsmallest(limit, matches)]
+
+    def candidates(self, name, limit=10, fuzzy=True):
+        """
+        Returns the people a query most likely means: exact matches if
+        there are any, otherwise names starting with it, then, unless
+        fuzzy is False, the closest names by the best-effort fuzzy lookup.
+        """
+        matches = [self.candidate(i, "exact", 0) for i in self.exact(name)[:limit]]
+        if not matches:
+            matches = self.prefix(name, limit=limit)
+        if not matches and fuzzy:
+            matches = self.fuzzy(name, limit=limit)
+        return matches
+
+    def resolve(self, name, birth=None):
+        """
+        Returns the IMDB id a name most likely means without asking:
+        among exact matches (or, failing that, the closest names) it prefers
+        someone born in the given year, then whoever starred in most movies.
+        Returns None if nothing matches.
+        """
+        matches = [self.candidate(i, "exact", 0) for i in self.exact(name)] or self.fuzzy(name)
+        if birth is not None:
+            matches = [m for m in matches if m["birth"] == str(birth)] or matches
+        return matches[0]["id"] if matches else None
@@ -0,0 +1,286 @@
+"""
+Degrees query server.
+
+Loads the graph once and answers JSON-lines requests over a Unix socket,
+one JSON object per line in each direction:
+
+    {"id": 1, "op": "path", "source": "Kevin Bacon", "target": "Tom Hanks"}
+    {"id": 2, "op": "lookup", "name": "tom hnks", "limit": 5, "fuzzy": true}
+    {"id": 3, "op": "metrics"}
+
+Searches, name resolution and name lookups, which may fall back to a slow
+best-effort fuzzy match (lookups skip it given "fuzzy": false), run in a pool of worker processes forked after the graph is
+loaded, so none of them blocks the event loop; recent results are kept in a
+bounded LRU cache and identical concurrent searches run only once.
+Every response carries its latency, and "metrics" reports percentiles.
+Lookup results mark each person as an "exact", "prefix" or "fuzzy" match,
+with the edit distance of exact and fuzzy ones.
+
+SIGTERM and SIGINT stop the server cleanly, removing its socket. A socket
+left behind by a server that died is replaced, but one that a running
+server still answers on is not.
+
+Usage:
+
+    python server.py [directory] [--socket PATH] [--workers N]
+    python server.py --client [--socket PATH] < requests.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from graph import Graph
+
+# Graph shared with forked search workers
+graph = None
+
+# Default socket path
+SOCKET = "degrees.sock"
+
+# Number of (source, target) results kept
+CACHE_SIZE = 4096
+
+# Number of recent latencies kept per operation for percentiles
+LATENCY_WINDOW = 10000
+
+
+def detach():
+    """
+    Runs first in each worker process: the server stops its workers itself,
+    so they ignore SIGINT, and SIGTERM gets back its default action instead
+    of the server's handler.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def listening(path):
+    """Returns whether a server answers on the Unix socket at path."""
+    with socket.socket(socket.AF_UNIX) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def search(source, target):
+    """Runs in a worker process: returns the path between two IMDB ids, or None."""
+    return graph.shortest_path(source, target, bidirectional=True)
+
+
+def resolve(query):
+    """Runs in a worker process: returns the IMDB id for an id or a name, or None."""
+    if graph.person_index(query) is not None:
+        return query
+    return graph.names.resolve(query)
+
+
+def candidates(name, limit, fuzzy):
+    """Runs in a worker process: returns the people best matching a name."""
+    return graph.names.candidates(name, limit, fuzzy)
+
+
+class Metrics():
+    """Request counts, errors, cache hits and latency percentiles per operation."""
+
+    def __init__(self):
+        self.requests = {}
+        self.errors = 0
+        self.hits = 0
+        self.misses = 0
+        self.latencies = {}
+
+    def record(self, op, seconds):
+        self.requests[op] = self.requests.get(op, 0) + 1
+        self.latencies.setdefault(op, deque(maxlen=LATENCY_WINDOW)).append(seconds * 1000)
+
+    def summary(self):
+        latency = {}
+        for op, values in self.latencies.items():
+            ordered = sorted(values)
+            latency[op] = {
+                f"p{p}": round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)], 3)
+                for p in (50, 90, 99)
+            }
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "cache": {"hits": self.hits, "misses": self.misses},
+            "latency_ms": latency
+        }
+
+
+class Server():
+
+    def __init__(self, workers=None, cache_size=CACHE_SIZE):
+        self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"),
+                                        initializer=detach)
+        self.cache = OrderedDict()
+        # Searches in flight, shared by identical concurrent requests
+        self.pending = {}
+        self.cache_size = cache_size
+        self.metrics = Metrics()
+
+    async def path(self, request):
+        loop = asyncio.get_running_loop()
+        source, target = await asyncio.gather(
+            loop.run_in_executor(self.pool, resolve, str(request["source"])),
+            loop.run_in_executor(self.pool, resolve, str(request["target"])))
+        if source is None or target is None:
+            raise LookupError("Person not found.")
+
+        key = (source, target)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.metrics.hits += 1
+            path = self.cache[key]
+        elif key in self.pending:
+            # The same search is already running for another request
+            self.metrics.hits += 1
+            path = await asyncio.shield(self.pending[key])
+        else:
+            self.metrics.misses += 1
+            self.pending[key] = loop.run_in_executor(self.pool, search, source, target)
+            try:
+                path = await asyncio.shield(self.pending[key])
+            finally:
+                del self.pending[key]
+            self.cache[key] = path
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return {
+            "source": source,
+            "target": target,
+            "degrees": None if path is None else len(path),
+            "path": path
+        }
+
+    async def lookup(self, request):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, candidates, str(request["name"]),
+                                          int(request.get("limit", 10)),
+                                          bool(request.get("fuzzy", True)))
+
+    async def handle(self, line):
+        """Answers one request line, returning the response object."""
+        started = time.perf_counter()
+        response = {}
+        op = "invalid"
+        try:
+            request = json.loads(line)
+            response["id"] = request.get("id")
+            op = request.get("op")
+            if op == "path":
+                response["result"] = await self.path(request)
+            elif op == "lookup":
+                response["result"] = await self.lookup(request)
+            elif op == "metrics":
+                response["result"] = self.metrics.summary()
+            else:
+                op = "invalid"
+                raise ValueError("op must be one of path, lookup or metrics")
+        except (LookupError, ValueError, TypeError, AttributeError) as e:
+            self.metrics.errors += 1
+            response["error"] = str(e)
+        elapsed = time.perf_counter() - started
+        self.metrics.record(op, elapsed)
+        response["latency_ms"] = round(elapsed * 1000, 3)
+        return response
+
+    async def connection(self, reader, writer):
+        """Serves one client, answering its requests concurrently and in any order."""
+        lock = asyncio.Lock()
+
+        async def reply(line):
+            response = await self.handle(line)
+            async with lock:
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(reply(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def serve(self, path):
+        """Serves on the Unix socket at path until SIGTERM or SIGINT."""
+        if listening(path):
+            raise RuntimeError(f"A server is already listening on {path}.")
+        if os.path.exists(path):
+            os.remove(path)
+        loop = asyncio.get_running_loop()
+        stopping = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stopping.set)
+        server = await asyncio.start_unix_server(self.connection, path=path)
+        print(f"Listening on {path}.", file=sys.stderr)
+        try:
+            async with server:
+                await stopping.wait()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            os.remove(path)
+        print("Stopped.", file=sys.stderr)
+
+
+async def client(path, lines, output):
+    """Stub client: sends each request line and writes every response line to output."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    count = 0
+    for line in lines:
+        if line.strip():
+            writer.write(line.rstrip("\n").encode("utf-8") + b"\n")
+            count += 1
+    await writer.drain()
+    for _ in range(count):
+        output.write((await reader.readline()).decode("utf-8"))
+    writer.close()
+    await writer.wait_closed()
+
+
+def main():
+    global graph
+    parser = argparse.ArgumentParser(description="Serve degrees of separation queries.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--socket", default=SOCKET, help="Unix socket path")
+    parser.add_argument("--workers", type=int, help="search worker processes")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE,
+                        help="number of recent results to keep")
+    parser.add_argument("--client", action="store_true",
+                        help="send request lines from stdin to a running server")
+    args = parser.parse_args()
+
+    if args.client:
+        asyncio.run(client(args.socket, sys.stdin, sys.stdout))
+        return
+
+    # Checked before loading so a second server fails fast; serve checks again
+    if listening(args.socket):
+        sys.exit(f"A server is already listening on {args.socket}.")
+    print("Loading data...", file=sys.stderr)
+    graph, _ = Graph.load(args.directory)
+    print("Data loaded.", file=sys.stderr)
+    try:
+        asyncio.run(Server(args.workers, args.cache_size).serve(args.socket))
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
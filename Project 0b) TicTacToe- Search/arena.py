@@ -0,0 +1,193 @@
+"""
+Headless Tic Tac Toe arena.
+
+Plays engine-vs-engine games across worker processes, with each engine
+taking X in half of the games, and reports the results, per-move latency
+percentiles and positions searched per move. Engines:
+
+    minimax   tictactoe.minimax (opening book, then alpha-beta)
+    search    alpha-beta without the opening book
+    mcts      tictactoe.mcts with --iterations per move
+    mnk       mnk.best_move with --budget seconds per move
+    random    a uniformly random legal move
+
+Perfect engines (minimax and search) must never lose; the arena exits with
+status 1 if one did, so it can gate engine changes.
+
+Usage:
+
+    python arena.py [first] [second] [--games N] [--workers N] [--seed N]
+                    [--iterations N] [--budget SECONDS] [--output FILE]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mnk
+import tictactoe as ttt
+from bitboard import ACTIONS, Bitboard
+
+# Engines that play perfectly and so must never lose
+PERFECT = {"minimax", "search"}
+
+# Games each worker plays per task
+CHUNK = 50
+
+
+def counted(engine):
+    """Wraps a tictactoe engine to also return the positions it searched."""
+    def move(board, rng, options):
+        nodes = ttt.search_stats["nodes"]
+        action = engine(board, options)
+        return action, ttt.search_stats["nodes"] - nodes
+    return move
+
+
+def search_move(board, options):
+    """Plays like minimax, but always searches instead of reading the opening book."""
+    bits = Bitboard.from_board(board)
+    if bits.x_to_move():
+        _, bit = ttt.max_value(bits, float("-inf"), float("inf"))
+    else:
+        _, bit = ttt.min_value(bits, float("-inf"), float("inf"))
+    return ACTIONS[bit]
+
+
+def mnk_move(board, rng, options):
+    action, stats = mnk.best_move(board, time_budget=options["budget"])
+    return action, stats["nodes"]
+
+
+# Engine name -> function of (board, rng, options) returning (action, positions searched)
+ENGINES = {
+    "minimax": counted(lambda board, options: ttt.minimax(board)),
+    "search": counted(search_move),
+    "mcts": counted(lambda board, options: ttt.mcts(board, options["iterations"])),
+    "mnk": mnk_move,
+    "random": lambda board, rng, options: (rng.choice(sorted(ttt.actions(board))), 0)
+}
+
+
+def play(engines, rng, options, moves):
+    """
+    Plays one game between the X and O engines, appending each engine's
+    (milliseconds, positions searched) per move to moves. Returns the winner.
+    """
+    board = ttt.initial_state()
+    while not ttt.terminal(board):
+        name = engines[ttt.player(board)]
+        started = time.perf_counter()
+        action, nodes = ENGINES[name](board, rng, options)
+        elapsed = time.perf_counter() - started
+        moves[name].append((elapsed * 1000, nodes))
+        board = ttt.result(board, action)
+    return ttt.winner(board)
+
+
+def play_chunk(first, second, start, count, seed, options):
+    """
+    Runs in a worker process: plays games start to start + count, where
+    first takes X in the even games. Returns the outcomes and move costs.
+    """
+    outcomes = {first: {"wins": 0, "losses": 0, "draws": 0},
+                second: {"wins": 0, "losses": 0, "draws": 0}}
+    moves = {first: [], second: []}
+    for game in range(start, start + count):
+        rng = random.Random(seed * 1000003 + game)
+        x, o = (first, second) if game % 2 == 0 else (second, first)
+        if "search" in (x, o):
+            # Every game should search from scratch, not from the previous game's table
+            ttt.clear_table()
+        winner = play({ttt.X: x, ttt.O: o}, rng, options, moves)
+        if first == second:
+            outcomes[first]["draws" if winner is None else "wins"] += 1
+            continue
+        if winner is None:
+            outcomes[x]["draws"] += 1
+            outcomes[o]["draws"] += 1
+        else:
+            won, lost = (x, o) if winner == ttt.X else (o, x)
+            outcomes[won]["wins"] += 1
+            outcomes[lost]["losses"] += 1
+    return outcomes, moves
+
+
+def percentiles(values, points=(50, 90, 99)):
+    ordered = sorted(values)
+    if not ordered:
+        return {f"p{p}": None for p in points}
+    return {f"p{p}": round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)], 3)
+            for p in points}
+
+
+def run(first, second, games, workers=None, seed=0, options=None):
+    """Plays games across worker processes and returns the summary of each engine."""
+    options = options or {"iterations": ttt.MCTS_ITERATIONS, "budget": 0.1}
+    outcomes = {}
+    moves = {first: [], second: []}
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(play_chunk, first, second, start, min(CHUNK, games - start),
+                               seed, options)
+                   for start in range(0, games, CHUNK)]
+        for future in futures:
+            chunk_outcomes, chunk_moves = future.result()
+            for name, counts in chunk_outcomes.items():
+                total = outcomes.setdefault(name, {"wins": 0, "losses": 0, "draws": 0})
+                for result, count in counts.items():
+                    total[result] += count
+            for name, costs in chunk_moves.items():
+                moves[name].extend(costs)
+
+    summary = {}
+    for name in dict.fromkeys((first, second)):
+        costs = moves[name]
+        summary[name] = {
+            **outcomes[name],
+            "moves": len(costs),
+            "latency_ms": percentiles([ms for ms, _ in costs]),
+            "nodes_per_move": percentiles([nodes for _, nodes in costs]),
+            "mean_nodes": sum(nodes for _, nodes in costs) / max(len(costs), 1)
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Tic Tac Toe engines against each other.")
+    parser.add_argument("first", nargs="?", default="minimax", choices=sorted(ENGINES))
+    parser.add_argument("second", nargs="?", default="random", choices=sorted(ENGINES))
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=ttt.MCTS_ITERATIONS,
+                        help="MCTS iterations per move")
+    parser.add_argument("--budget", type=float, default=0.1, help="mnk seconds per move")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    summary = run(args.first, args.second, args.games, args.workers, args.seed,
+                  {"iterations": args.iterations, "budget": args.budget})
+    seconds = time.perf_counter() - started
+    print(f"{args.games} games in {seconds:.2f}s ({args.games / seconds:.1f} games/s)")
+    for name, result in summary.items():
+        latency = result["latency_ms"]
+        print(f"{name:>8}: {result['wins']} wins, {result['losses']} losses, {result['draws']} draws; "
+              f"move p50 {latency['p50']} ms, p90 {latency['p90']} ms, p99 {latency['p99']} ms; "
+              f"{result['mean_nodes']:.1f} nodes/move")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "seconds": seconds, "engines": summary}, f, indent=2)
+
+    lost = [name for name in PERFECT & summary.keys() if summary[name]["losses"]]
+    if lost:
+        print(f"Perfect play lost: {', '.join(lost)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Bitboard Tic Tac Toe representation.
+
+Each player's marks are a 9-bit integer where bit 3 * i + j is cell (i, j).
+Wins are mask comparisons, and moves are made and undone in place instead
+of copying the board.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Every cell set
+FULL = (1 << 9) - 1
+
+# Rows, columns and diagonals
+WINS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+)
+
+# Single-cell masks and their (i, j) actions
+CELLS = tuple(1 << bit for bit in range(9))
+ACTIONS = tuple((bit // 3, bit % 3) for bit in range(9))
+
+
+def has_won(marks):
+    """Returns True if a player's marks contain a full line."""
+    for line in WINS:
+        if marks & line == line:
+            return True
+    return False
+
+
+class Bitboard():
+
+    def __init__(self, x=0, o=0):
+        self.x = x
+        self.o = o
+
+    @classmethod
+    def from_board(cls, board):
+        """Converts the list-of-lists board used by tictactoe.py and runner.py."""
+        x = o = 0
+        for i in range(3):
+            for j in range(3):
+                if board[i][j] == X:
+                    x |= CELLS[3 * i + j]
+                elif board[i][j] == O:
+                    o |= CELLS[3 * i + j]
+        return cls(x, o)
+
+    def to_board(self):
+        """Returns the equivalent list-of-lists board."""
+        return [[X if self.x & CELLS[3 * i + j] else O if self.o & CELLS[3 * i + j] else EMPTY
+                 for j in range(3)]
+                for i in range(3)]
+
+    def empty(self):
+        """Returns the mask of empty cells."""
+        return FULL & ~(self.x | self.o)
+
+    def x_to_move(self):
+        return self.x.bit_count() == self.o.bit_count()
+
+    def player(self):
+        return X if self.x_to_move() else O
+
+    def moves(self):
+        """Yields the bit of every empty cell."""
+        empty = self.empty()
+        while empty:
+            cell = empty & -empty
+            yield cell.bit_length() - 1
+            empty ^= cell
+
+    def make(self, bit):
+        """Marks a cell for the player to move. Returns the player's new marks."""
+        if self.x_to_move():
+            self.x |= CELLS[bit]
+            return self.x
+        self.o |= CELLS[bit]
+        return self.o
+
+    def unmake(self, bit):
+        """Clears a cell made by make."""
+        self.x &= ~CELLS[bit]
+        self.o &= ~CELLS[bit]
+
+    def winner(self):
+        if has_won(self.x):
+            return X
+        if has_won(self.o):
+            return O
+        return None
+
+    def terminal(self):
+        return self.x | self.o == FULL or has_won(self.x) or has_won(self.o)
+
+    def utility(self):
+        if has_won(self.x):
+            return 1
+        if has_won(self.o):
+            return -1
+        return 0
+
+
+def symmetries():
+    """
+    Returns the 8 rotations and reflections of the board as permutations,
+    where permutation[bit] is the bit that cell moves to.
+    """
+    permutations = []
+    for rotations in range(4):
+        for reflect in (False, True):
+            permutation = []
+            for bit in range(9):
+                i, j = divmod(bit, 3)
+                for _ in range(rotations):
+                    i, j = j, 2 - i
+                if reflect:
+                    j = 2 - j
+                permutation.append(3 * i + j)
+            permutations.append(tuple(permutation))
+    return tuple(permutations)
+
+
+SYMMETRIES = symmetries()
+
+# TRANSFORMS[s][mask] is mask with its cells moved by symmetry s
+TRANSFORMS = tuple(
+    tuple(sum(1 << permutation[bit] for bit in range(9) if mask >> bit & 1)
+          for mask in range(1 << 9))
+    for permutation in SYMMETRIES
+)
+
+# INVERSES[s][bit] is the cell that symmetry s moves to bit
+INVERSES = tuple(
+    tuple(permutation.index(bit) for bit in range(9))
+    for permutation in SYMMETRIES
+)
+
+
+def canonical(x, o):
+    """
+    Returns a key shared by all 8 symmetric variants of a position,
+    and the symmetry that maps the position onto it.
+    """
+    best, symmetry = None, 0
+    for s, transform in enumerate(TRANSFORMS):
+        key = transform[x] << 9 | transform[o]
+        if best is None or key < best:
+            best, symmetry = key, s
+    return best, symmetry
@@ -0,0 +1,115 @@
+"""
+Perfect-play opening book for Tic Tac Toe.
+
+The whole 3x3 game is small enough to solve once: the build step visits
+every reachable position, solves it with minimax and writes each canonical
+position (up to rotation and reflection) with its best move and value.
+minimax then answers from the book with one dict lookup.
+
+Build the book with:
+
+    python book.py
+"""
+
+import os
+import struct
+from array import array
+
+from bitboard import INVERSES, SYMMETRIES, Bitboard, canonical
+
+# Book file written next to this module
+BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Bump whenever the book layout or the value scale changes
+BOOK_VERSION = 1
+
+# Books start with the magic bytes, the version and the number of positions
+MAGIC = b"TTTBOOK\0"
+PREFIX = struct.Struct("<8sII")
+
+# Canonical position key -> (canonical best move, value), once loaded
+entries = None
+
+
+def positions():
+    """Returns the canonical keys and Bitboards of every reachable non-terminal position."""
+    found = {}
+
+    def visit(board):
+        if board.terminal():
+            return
+        key, _ = canonical(board.x, board.o)
+        if key in found:
+            return
+        found[key] = Bitboard(board.x, board.o)
+        for bit in board.moves():
+            board.make(bit)
+            visit(board)
+            board.unmake(bit)
+
+    visit(Bitboard())
+    return found
+
+
+def build(path=BOOK):
+    """Solves every position and writes the book. Returns the number of positions."""
+    import tictactoe
+
+    keys, moves, values = array("I"), array("b"), array("b")
+    for key, board in sorted(positions().items()):
+        if board.x_to_move():
+            value, bit = tictactoe.max_value(board, float("-inf"), float("inf"))
+        else:
+            value, bit = tictactoe.min_value(board, float("-inf"), float("inf"))
+        _, symmetry = canonical(board.x, board.o)
+        keys.append(key)
+        moves.append(SYMMETRIES[symmetry][bit])
+        values.append(value)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, BOOK_VERSION, len(keys)))
+        f.write(keys.tobytes())
+        f.write(moves.tobytes())
+        f.write(values.tobytes())
+    os.replace(temporary, path)
+    return len(keys)
+
+
+def load(path=BOOK):
+    """Reads a book into a dict, or returns an empty one if it is missing or outdated."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, count = PREFIX.unpack_from(data)
+    except (OSError, struct.error):
+        return {}
+    if magic != MAGIC or version != BOOK_VERSION:
+        return {}
+    keys, moves, values = array("I"), array("b"), array("b")
+    start = PREFIX.size
+    keys.frombytes(data[start:start + count * keys.itemsize])
+    start += count * keys.itemsize
+    moves.frombytes(data[start:start + count])
+    values.frombytes(data[start + count:start + 2 * count])
+    return {key: (move, value) for key, move, value in zip(keys, moves, values)}
+
+
+def lookup(board):
+    """
+    Returns the best move's bit and the value of a Bitboard from the book,
+    or None if the book is missing or does not have the position.
+    """
+    global entries
+    if entries is None:
+        entries = load()
+    key, symmetry = canonical(board.x, board.o)
+    entry = entries.get(key)
+    if entry is None:
+        return None
+    move, value = entry
+    return INVERSES[symmetry][move], value
+
+
+if __name__ == "__main__":
+    print(f"Wrote {build()} positions to {BOOK}.")
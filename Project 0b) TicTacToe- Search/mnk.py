@@ -0,0 +1,302 @@
+"""
+Generalized m,n,k game engine: k in a row wins on an m x n board, so 3,3,3
+is Tic Tac Toe and 15,15,5 is gomoku.
+
+Boards are bitboards over Python integers, where bit n * i + j is cell (i, j).
+The search is iterative-deepening alpha-beta (negamax) with killer and
+history move ordering, a line-counting evaluation where the depth runs out,
+and a per-move time budget. Every search reports its nodes per second.
+
+Play the engine against itself with:
+
+    python mnk.py [m] [n] [k] [--budget SECONDS] [--depth N]
+"""
+
+import argparse
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a won position; every ply to the win costs one point
+WIN = 1_000_000
+
+# Nodes searched between checks of the clock
+CHECK_EVERY = 1024
+
+# Boards with more cells only search the cells next to a stone
+NEAR_CELLS = 25
+
+
+class Timeout(Exception):
+    pass
+
+
+class MNKBoard():
+
+    def __init__(self, m=3, n=3, k=3):
+        self.m = m
+        self.n = n
+        self.k = k
+        self.x = 0
+        self.o = 0
+        self.full = (1 << (m * n)) - 1
+
+        # Every k-in-a-row segment, and the segments through each cell
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.lines.append(sum(1 << (n * (i + di * s) + j + dj * s)
+                                              for s in range(k)))
+        self.cell_lines = [[line for line in self.lines if line >> bit & 1]
+                           for bit in range(m * n)]
+
+        # Cells within one step of each cell, to keep the search near the stones
+        self.around = []
+        for bit in range(m * n):
+            i, j = divmod(bit, n)
+            self.around.append(sum(1 << (n * a + b)
+                                   for a in range(max(0, i - 1), min(m, i + 2))
+                                   for b in range(max(0, j - 1), min(n, j + 2))))
+
+    @classmethod
+    def from_board(cls, board, k=None):
+        """Converts a list-of-lists board, by default with k = its smaller side."""
+        m, n = len(board), len(board[0])
+        mnk = cls(m, n, k or min(m, n))
+        for i in range(m):
+            for j in range(n):
+                if board[i][j] == X:
+                    mnk.x |= 1 << (n * i + j)
+                elif board[i][j] == O:
+                    mnk.o |= 1 << (n * i + j)
+        return mnk
+
+    def to_board(self):
+        return [[X if self.x >> (self.n * i + j) & 1 else O if self.o >> (self.n * i + j) & 1
+                 else EMPTY for j in range(self.n)]
+                for i in range(self.m)]
+
+    def action(self, bit):
+        """Returns the (i, j) action of a cell's bit."""
+        return divmod(bit, self.n)
+
+    def x_to_move(self):
+        return self.x.bit_count() == self.o.bit_count()
+
+    def empty(self):
+        return self.full & ~(self.x | self.o)
+
+    def moves(self):
+        """
+        Returns the bits of the empty cells. Boards larger than NEAR_CELLS
+        only offer the cells next to a stone, or the centre when empty.
+        """
+        stones = self.x | self.o
+        if self.m * self.n <= NEAR_CELLS:
+            near = self.empty()
+        elif not stones:
+            return [self.n * (self.m // 2) + self.n // 2]
+        else:
+            near = 0
+            while stones:
+                cell = stones & -stones
+                near |= self.around[cell.bit_length() - 1]
+                stones ^= cell
+            near &= self.empty()
+        moves = []
+        while near:
+            cell = near & -near
+            moves.append(cell.bit_length() - 1)
+            near ^= cell
+        return moves
+
+    def make(self, bit):
+        """Marks a cell for the player to move. Returns True if that move won."""
+        if self.x_to_move():
+            self.x |= 1 << bit
+            marks = self.x
+        else:
+            self.o |= 1 << bit
+            marks = self.o
+        for line in self.cell_lines[bit]:
+            if marks & line == line:
+                return True
+        return False
+
+    def unmake(self, bit):
+        self.x &= ~(1 << bit)
+        self.o &= ~(1 << bit)
+
+    def won(self, marks):
+        for line in self.lines:
+            if marks & line == line:
+                return True
+        return False
+
+    def winner(self):
+        if self.won(self.x):
+            return X
+        if self.won(self.o):
+            return O
+        return None
+
+    def terminal(self):
+        return self.x | self.o == self.full or self.winner() is not None
+
+    def evaluate(self):
+        """
+        Scores the position for the player to move: every line still open to
+        only one player is worth 10 ** (its stones - 1) to that player.
+        """
+        score = 0
+        for line in self.lines:
+            xs = self.x & line
+            os = self.o & line
+            if xs and not os:
+                score += 10 ** (xs.bit_count() - 1)
+            elif os and not xs:
+                score -= 10 ** (os.bit_count() - 1)
+        return score if self.x_to_move() else -score
+
+
+class Engine():
+    """Iterative-deepening alpha-beta search with killer and history heuristics."""
+
+    def __init__(self, time_budget=1.0, max_depth=None):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.killers = {}
+        self.history = {}
+        self.nodes = 0
+        self.deadline = None
+
+    def order(self, board, moves, ply, first):
+        """Sorts moves: the previous iteration's best, then killers, then by history."""
+        killers = self.killers.get(ply, ())
+        return sorted(moves, key=lambda bit: (bit != first, bit not in killers,
+                                              -self.history.get(bit, 0)))
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+            raise Timeout()
+        if depth == 0:
+            return board.evaluate(), None
+        moves = board.moves()
+        if not moves:
+            return 0, None
+
+        best, best_value = None, -WIN * 2
+        for bit in self.order(board, moves, ply, None):
+            if board.make(bit):
+                value = WIN - ply - 1
+            elif not board.empty():
+                value = 0
+            else:
+                value = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)[0]
+            board.unmake(bit)
+            if value > best_value:
+                best, best_value = bit, value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                # Remember quiet refutations for siblings, and reward them across the tree
+                killers = self.killers.setdefault(ply, [])
+                if bit not in killers:
+                    killers.insert(0, bit)
+                    del killers[2:]
+                self.history[bit] = self.history.get(bit, 0) + depth * depth
+                break
+        return best_value, best
+
+    def root(self, board, depth, first):
+        """Searches the root at one depth, trying the previous best move first."""
+        alpha, beta = -WIN * 2, WIN * 2
+        best, best_value = None, -WIN * 2
+        for bit in self.order(board, board.moves(), 0, first):
+            if board.make(bit):
+                value = WIN - 1
+            elif not board.empty():
+                value = 0
+            else:
+                value = -self.negamax(board, depth - 1, -beta, -alpha, 1)[0]
+            board.unmake(bit)
+            if value > best_value:
+                best, best_value = bit, value
+            alpha = max(alpha, value)
+        return best_value, best
+
+    def search(self, board):
+        """
+        Deepens until the time budget or max_depth runs out, or the result is
+        certain. Returns the best move's bit and the search statistics.
+        """
+        started = time.perf_counter()
+        self.deadline = started + self.time_budget
+        self.nodes = 0
+        best, value, depth = None, 0, 0
+        limit = self.max_depth or board.empty().bit_count()
+        x, o = board.x, board.o
+        while depth < limit:
+            try:
+                value, best = self.root(board, depth + 1, best)
+            except Timeout:
+                # The interrupted iteration left its moves on the board
+                board.x, board.o = x, o
+                break
+            depth += 1
+            if abs(value) >= WIN - board.m * board.n:
+                break
+        if best is None:
+            best = board.moves()[0]
+        seconds = time.perf_counter() - started
+        return best, {
+            "depth": depth,
+            "value": value,
+            "nodes": self.nodes,
+            "seconds": seconds,
+            "nodes_per_second": self.nodes / seconds if seconds else 0.0
+        }
+
+
+def best_move(board, k=None, time_budget=1.0, max_depth=None):
+    """
+    Returns the (i, j) action the engine picks on a list-of-lists board of any
+    size, with k in a row to win, and the search statistics.
+    """
+    mnk = MNKBoard.from_board(board, k)
+    if mnk.terminal():
+        return None, None
+    bit, stats = Engine(time_budget, max_depth).search(mnk)
+    return mnk.action(bit), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play the m,n,k engine against itself.")
+    parser.add_argument("m", type=int, nargs="?", default=3, help="rows")
+    parser.add_argument("n", type=int, nargs="?", default=3, help="columns")
+    parser.add_argument("k", type=int, nargs="?", default=3, help="marks in a row to win")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per move")
+    parser.add_argument("--depth", type=int, help="maximum search depth")
+    args = parser.parse_args()
+
+    board = MNKBoard(args.m, args.n, args.k)
+    engine = Engine(args.budget, args.depth)
+    while not board.terminal():
+        player = X if board.x_to_move() else O
+        bit, stats = engine.search(board)
+        board.make(bit)
+        print(f"{player} plays {board.action(bit)}: depth {stats['depth']}, "
+              f"value {stats['value']}, {stats['nodes']} nodes, "
+              f"{stats['nodes_per_second']:,.0f} nodes/s")
+    for row in board.to_board():
+        print(" ".join(cell or "." for cell in row))
+    print(f"Winner: {board.winner() or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,14 @@ Tic Tac Toe Player
 
 import math
 import copy
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import book
+from bitboard import ACTIONS, INVERSES, SYMMETRIES, Bitboard, canonical
+from mnk import MNKBoard
 
 X = "X"
 O = "O"
@@ -81,37 +89,132 @@ def utility(board):
     return utility[winner(board)] if winner(board) != None else 0
 
 
-def max_value(board, alpha, beta, depth):
-    if terminal(board):
-        return utility(board) / depth, None
+# Transposition table shared by every search: canonical position key -> (value, flag, move)
+table = {}
+
+# Transposition table hits and misses since the last clear_table
+table_stats = {"hits": 0, "misses": 0}
+
+# Positions searched by minimax and MCTS iterations run, for benchmarking
+search_stats = {"nodes": 0}
+
+# Whether a stored value is exact or only a lower or upper bound from an alpha-beta cutoff
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Value of a won position; every ply to the win costs one point, so faster wins score higher
+WIN = 10
+
+
+def clear_table():
+    """Empties the transposition table and resets its counters."""
+    table.clear()
+    table_stats["hits"] = table_stats["misses"] = 0
+
+
+def decay(value):
+    """Converts a child's value to its parent's: a win or loss is one ply further away."""
+    return value - 1 if value > 0 else value + 1 if value < 0 else 0
+
+
+def undecay(bound):
+    """Converts a parent's alpha or beta to the child's, the inverse of decay."""
+    return bound + 1 if bound > 0 else bound - 1 if bound < 0 else 0
+
+
+def probe(board, alpha, beta):
+    """
+    Looks a Bitboard up in the transposition table. Returns the entry's
+    value, its move mapped back onto the board, the narrowed alpha and
+    beta, and whether the stored value settles the search.
+    """
+    key, symmetry = canonical(board.x, board.o)
+    entry = table.get(key)
+    if entry is None:
+        table_stats["misses"] += 1
+        return None, None, alpha, beta, False
+    table_stats["hits"] += 1
+    value, flag, move = entry
+    move = None if move is None else INVERSES[symmetry][move]
+    if flag == LOWER:
+        alpha = max(alpha, value)
+    elif flag == UPPER:
+        beta = min(beta, value)
+    return value, move, alpha, beta, flag == EXACT or alpha >= beta
+
+
+def store(board, value, alpha, beta, move):
+    """Stores a searched value with the bound it represents under the window it was searched with."""
+    key, symmetry = canonical(board.x, board.o)
+    flag = UPPER if value <= alpha else LOWER if value >= beta else EXACT
+    table[key] = (value, flag, None if move is None else SYMMETRIES[symmetry][move])
+
+
+def ordered(board, first):
+    """Yields the moves of a Bitboard, starting with the transposition table's best move."""
+    if first is not None:
+        yield first
+    for bit in board.moves():
+        if bit != first:
+            yield bit
+
+
+def max_value(board, alpha, beta):
+    """
+    Searches a Bitboard for X, making and undoing moves in place.
+    Returns the value of the board and the best move's bit.
+    """
+    search_stats["nodes"] += 1
+    if board.terminal():
+        return board.utility() * WIN, None
+    value, move, alpha, beta, settled = probe(board, alpha, beta)
+    if settled:
+        return value, move
+    start_alpha = alpha
     v = float("-inf")
     best = None
-    for action in actions(board):
-        value, a = min_value(result(board, action), alpha, beta, depth+1)
-        # We increase the depth at each iteration so the utility value can be tailored based on that
+    for bit in ordered(board, move):
+        board.make(bit)
+        value, _ = min_value(board, undecay(alpha), undecay(beta))
+        board.unmake(bit)
+        # Values are relative to this position, so a win one ply further away is worth one less
+        value = decay(value)
         if value > v:
             v = value
-            best = action
+            best = bit
         alpha = max(alpha, v)
         if v >= beta: # If we find a value that is higher or equal than beta, then we directly return that value
-            return v, best
+            break
+    store(board, v, start_alpha, beta, best)
     return v, best
 
 
-def min_value(board, alpha, beta, depth):
-    if terminal(board):
-        return utility(board) / depth, None
+def min_value(board, alpha, beta):
+    """
+    Searches a Bitboard for O, making and undoing moves in place.
+    Returns the value of the board and the best move's bit.
+    """
+    search_stats["nodes"] += 1
+    if board.terminal():
+        return board.utility() * WIN, None
+    value, move, alpha, beta, settled = probe(board, alpha, beta)
+    if settled:
+        return value, move
+    start_beta = beta
     v = float("inf")
     best = None
-    for action in actions(board):
-        value, a = max_value(result(board, action), alpha, beta, depth+1)
-        # We increase the depth at each iteration so the utility value can be tailored based on that
+    for bit in ordered(board, move):
+        board.make(bit)
+        value, _ = max_value(board, undecay(alpha), undecay(beta))
+        board.unmake(bit)
+        # Values are relative to this position, so a win one ply further away is worth one less
+        value = decay(value)
         if value < v:
             v = value
-            best = action
+            best = bit
         beta = min(beta, v)
         if v <= alpha: # If we find a value that is lower or equal than alpha, then we directly return that value
-            return v, best
+            break
+    store(board, v, alpha, start_beta, best)
     return v, best
 
 
@@ -121,8 +224,162 @@ def minimax(board):
     """
     if terminal(board):
         return None
-    depth = 1 # We not only want to calculate the winning move but also the fastest one
-    # The utility of the terminal board is divided by the depth. This way, the greater the depth, the smaller the value. Values are not just 1, -1 or 0 anymore.
+    # We not only want to calculate the winning move but also the fastest one:
+    # a win scores WIN minus the plies needed to reach it, so values are not just 1, -1 or 0 anymore.
+    # Scores only depend on the position, so they can be reused across searches through the table.
     initial_alpha = float("-inf")
     initial_beta = float("inf")
-    return (max_value(board, initial_alpha, initial_beta, depth))[1] if player(board) == X else (min_value(board, initial_alpha, initial_beta, depth))[1]
\ No newline at end of file
+    # Search a bitboard copy, so the list-of-lists board is never copied or changed
+    bits = Bitboard.from_board(board)
+    # Every reachable position is in the opening book once it has been built with book.py
+    entry = book.lookup(bits)
+    if entry is not None:
+        return ACTIONS[entry[0]]
+    value, bit = max_value(bits, initial_alpha, initial_beta) if player(board) == X else min_value(bits, initial_alpha, initial_beta)
+    return ACTIONS[bit]
+
+
+
+# Default number of MCTS iterations per move
+MCTS_ITERATIONS = 10000
+
+# UCT exploration constant
+EXPLORATION = math.sqrt(2)
+
+# Iterations between checks of the clock
+MCTS_CHECK_EVERY = 64
+
+# How the move into a node ended the game: not at all, with a win for its mover, or in a draw
+ONGOING, WON, DRAWN = 0, 1, 2
+
+
+def empty_bits(board):
+    """Returns the bits of the empty cells of an MNKBoard."""
+    empty = board.empty()
+    bits = []
+    while empty:
+        cell = empty & -empty
+        bits.append(cell.bit_length() - 1)
+        empty ^= cell
+    return bits
+
+
+def step(board, bit):
+    """Makes a move on an MNKBoard and returns how it ended the game."""
+    if board.make(bit):
+        return WON
+    return DRAWN if not board.empty() else ONGOING
+
+
+def rollout(board, rng):
+    """
+    Plays random moves on an MNKBoard until the game ends, leaving them on the board.
+    Returns True if the player to move at the start won, False if they lost, None for a draw.
+    """
+    moves = empty_bits(board)
+    rng.shuffle(moves)
+    for ply, bit in enumerate(moves):
+        if board.make(bit):
+            return ply % 2 == 0
+    return None
+
+
+def uct(x, o, m, n, k, iterations, time_budget, seed):
+    """
+    Runs UCT from the position with X marks x and O marks o on an m,n,k board.
+    Returns the visit count of each root move's bit and the number of iterations run.
+
+    Nodes live in flat arrays indexed by node number; a node's children are
+    allocated together, so they are the range first[node] to first[node] + count[node].
+    """
+    rng = random.Random(seed)
+    board = MNKBoard(m, n, k)
+    moves, first, count, ended = array("i", [-1]), array("i", [-1]), array("i", [0]), array("b", [ONGOING])
+    # Wins are counted for the player who made the move into the node, draws as half a win
+    visits, wins = array("i", [0]), array("d", [0.0])
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    iteration = 0
+    while iteration < iterations:
+        if deadline is not None and iteration % MCTS_CHECK_EVERY == 0 and time.perf_counter() > deadline:
+            break
+        iteration += 1
+        board.x, board.o = x, o
+        node = 0
+        path = [0]
+
+        # Selection: descend through expanded nodes by the UCT score
+        while first[node] >= 0 and ended[node] == ONGOING:
+            log_visits = math.log(visits[node])
+            best, best_score = None, -1.0
+            for child in range(first[node], first[node] + count[node]):
+                if visits[child] == 0:
+                    best = child
+                    break
+                score = wins[child] / visits[child] + EXPLORATION * math.sqrt(log_visits / visits[child])
+                if score > best_score:
+                    best, best_score = child, score
+            node = best
+            path.append(node)
+            ended[node] = step(board, moves[node])
+
+        # Expansion: a leaf gets all its children on its second visit, then one is tried
+        if ended[node] == ONGOING and (node == 0 or visits[node] > 0):
+            children = empty_bits(board)
+            first[node], count[node] = len(moves), len(children)
+            for bit in children:
+                moves.append(bit)
+                first.append(-1)
+                count.append(0)
+                visits.append(0)
+                wins.append(0.0)
+                ended.append(ONGOING)
+            node = first[node] + rng.randrange(len(children))
+            path.append(node)
+            ended[node] = step(board, moves[node])
+
+        # Simulation: the reward of the player who moved into the leaf
+        if ended[node] == WON:
+            reward = 1.0
+        elif ended[node] == DRAWN:
+            reward = 0.5
+        else:
+            won = rollout(board, rng)
+            reward = 0.5 if won is None else 0.0 if won else 1.0
+
+        # Backpropagation: players alternate up the path
+        for visited in reversed(path):
+            visits[visited] += 1
+            wins[visited] += reward
+            reward = 1.0 - reward
+
+    return {moves[child]: visits[child] for child in range(first[0], first[0] + count[0])}, iteration
+
+
+def mcts(board, iterations=MCTS_ITERATIONS, time_budget=None, workers=1, k=None):
+    """
+    Returns the action Monte Carlo Tree Search picks for the current player
+    on a board of any size, with k in a row to win (by default its smaller side).
+
+    Searches for the given iterations or until time_budget seconds pass,
+    whichever comes first. With several workers each searches its own tree
+    in a separate process and their root visit counts are added up.
+    """
+    mnk = MNKBoard.from_board(board, k)
+    if mnk.terminal():
+        return None
+    args = (mnk.x, mnk.o, mnk.m, mnk.n, mnk.k)
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(uct, *args, -(-iterations // workers), time_budget, random.random())
+                       for _ in range(workers)]
+            counts = {}
+            for future in futures:
+                root, run = future.result()
+                search_stats["nodes"] += run
+                for bit, visits in root.items():
+                    counts[bit] = counts.get(bit, 0) + visits
+    else:
+        counts, run = uct(*args, iterations, time_budget, random.random())
+        search_stats["nodes"] += run
+    return mnk.action(max(counts, key=counts.get))
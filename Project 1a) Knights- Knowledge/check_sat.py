@@ -0,0 +1,98 @@
+"""
+Randomized equivalence check of sat.py against model enumeration.
+
+Builds random knowledge bases and queries from every connective, including
+empty conjunctions and disjunctions, and checks that the SAT solver agrees
+with enumerating every model through Sentence.evaluate on whether the
+knowledge entails the query, and that every model satisfiable returns makes
+the sentence true. Exits with status 1 on any disagreement.
+
+Usage:
+
+    python check_sat.py [--trials N] [--symbols N] [--seed N]
+"""
+
+import argparse
+import itertools
+import random
+import sys
+
+import sat
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Nesting depth of random knowledge sentences and of random queries
+KNOWLEDGE_DEPTH = 3
+QUERY_DEPTH = 2
+
+
+def random_sentence(rng, names, depth):
+    """Returns a random sentence over names, nested at most depth connectives deep."""
+    if depth == 0 or rng.random() < 0.25:
+        symbol = Symbol(rng.choice(names))
+        return Not(symbol) if rng.random() < 0.3 else symbol
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(random_sentence(rng, names, depth - 1))
+    if kind in (1, 2):
+        operands = [random_sentence(rng, names, depth - 1) for _ in range(rng.randint(0, 3))]
+        return And(*operands) if kind == 1 else Or(*operands)
+    left = random_sentence(rng, names, depth - 1)
+    right = random_sentence(rng, names, depth - 1)
+    return Implication(left, right) if kind == 3 else Biconditional(left, right)
+
+
+def entails(knowledge, query):
+    """Checks entailment by evaluating knowledge and query in every model."""
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    for values in itertools.product((True, False), repeat=len(symbols)):
+        model = dict(zip(symbols, values))
+        if knowledge.evaluate(model) and not query.evaluate(model):
+            return False
+    return True
+
+
+def check(trials, symbols, seed):
+    """Runs trials random checks and returns the number of disagreements."""
+    rng = random.Random(seed)
+    failures = 0
+    for trial in range(trials):
+        names = [f"S{i}" for i in range(rng.randint(1, symbols))]
+        knowledge = And(*[random_sentence(rng, names, KNOWLEDGE_DEPTH)
+                          for _ in range(rng.randint(1, 4))])
+        # Queries may mention a symbol the knowledge says nothing about
+        query = random_sentence(rng, names + ["Extra"], QUERY_DEPTH)
+
+        expected = entails(knowledge, query)
+        if sat.model_check(knowledge, query) != expected:
+            failures += 1
+            print(f"Trial {trial}: model_check disagrees, expected {expected}\n"
+                  f"    knowledge: {knowledge!r}\n    query: {query!r}")
+
+        model = sat.satisfiable(knowledge)
+        if model is None:
+            satisfied = entails(knowledge, Or())
+        else:
+            # Symbols the clauses never constrain may be missing from the model
+            model = {name: model.get(name, False) for name in knowledge.symbols()}
+            satisfied = knowledge.evaluate(model)
+        if not satisfied:
+            failures += 1
+            print(f"Trial {trial}: satisfiable is wrong\n    knowledge: {knowledge!r}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check sat.py against model enumeration.")
+    parser.add_argument("--trials", type=int, default=3000)
+    parser.add_argument("--symbols", type=int, default=7, help="most symbols per trial")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = check(args.trials, args.symbols, args.seed)
+    print(f"{args.trials} trials, {failures} disagreements.")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
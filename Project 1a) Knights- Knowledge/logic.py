@@ -1,4 +1,15 @@
 import itertools
+import weakref
+from array import array
+
+# Above this many symbols model_check hands entailment to the SAT solver in sat.py
+SAT_SYMBOLS = 20
+
+# Models a KnowledgeBase keeps before it answers queries with the SAT solver
+MODEL_LIMIT = 1024
+
+# Nesting depth at which compile moves a subexpression into its own statement
+COMPILE_DEPTH = 40
 
 
 class Sentence():
@@ -15,6 +26,55 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def partial_evaluate(self, model):
+        """
+        Evaluates the logical sentence under a model that may leave symbols out:
+        returns True or False if every completion of the model agrees, else None.
+        """
+        raise Exception("nothing to evaluate")
+
+    def expression(self, indices, operand):
+        """
+        Returns a Python expression evaluating the sentence on an int model m,
+        where bit indices[name] of m is the truth of symbol name, and
+        operand(sentence) returns the expression of one of its parts.
+        """
+        raise Exception("nothing to compile")
+
+    def compile(self, symbols):
+        """
+        Returns a function evaluating the sentence on an int model, where bit i
+        is the truth of symbols[i]. Only frozen sentences cache it: a mutable
+        one can change below any of its parts.
+        """
+        symbols = tuple(symbols)
+        compiled = self.__dict__.setdefault("_compiled", {}) if isinstance(self, Frozen) else {}
+        if symbols not in compiled:
+            indices = {name: i for i, name in enumerate(symbols)}
+            # Parts stay inline so and/or short-circuit, but any part nested
+            # COMPILE_DEPTH deep becomes a statement of its own: Python's parser
+            # rejects expressions nested much deeper than that
+            lines = []
+            heights = []
+
+            def operand(sentence):
+                heights.append(0)
+                expression = sentence.expression(indices, operand)
+                height = heights.pop() + 1
+                if height >= COMPILE_DEPTH:
+                    lines.append(f"    v{len(lines)} = {expression}")
+                    expression, height = f"v{len(lines) - 1}", 0
+                if heights:
+                    heights[-1] = max(heights[-1], height)
+                return f"({expression})"
+
+            result = operand(self)
+            namespace = {}
+            exec("def evaluate(m):\n" + "".join(line + "\n" for line in lines)
+                 + f"    return bool({result})\n", namespace)
+            compiled[symbols] = namespace["evaluate"]
+        return compiled[symbols]
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -62,12 +122,22 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def partial_evaluate(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
     def symbols(self):
         return {self.name}
 
+    def expression(self, indices, operand):
+        try:
+            return f"m >> {indices[self.name]} & 1"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
 
 class Not(Sentence):
     def __init__(self, operand):
@@ -86,12 +156,19 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def partial_evaluate(self, model):
+        value = self.operand.partial_evaluate(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
         return self.operand.symbols()
 
+    def expression(self, indices, operand):
+        return f"not {operand(self.operand)}"
+
 
 class And(Sentence):
     def __init__(self, *conjuncts):
@@ -100,7 +177,8 @@ class And(Sentence):
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return (isinstance(other, And)
+                and tuple(self.conjuncts) == tuple(other.conjuncts))
 
     def __hash__(self):
         return hash(
@@ -120,6 +198,16 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def partial_evaluate(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.partial_evaluate(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -127,7 +215,12 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return set().union(*[conjunct.symbols() for conjunct in self.conjuncts])
+
+    def expression(self, indices, operand):
+        if not self.conjuncts:
+            return "True"
+        return " and ".join([operand(conjunct) for conjunct in self.conjuncts])
 
 
 class Or(Sentence):
@@ -137,7 +230,8 @@ class Or(Sentence):
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return (isinstance(other, Or)
+                and tuple(self.disjuncts) == tuple(other.disjuncts))
 
     def __hash__(self):
         return hash(
@@ -151,6 +245,16 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def partial_evaluate(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.partial_evaluate(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -158,7 +262,12 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return set().union(*[disjunct.symbols() for disjunct in self.disjuncts])
+
+    def expression(self, indices, operand):
+        if not self.disjuncts:
+            return "False"
+        return " or ".join([operand(disjunct) for disjunct in self.disjuncts])
 
 
 class Implication(Sentence):
@@ -183,13 +292,27 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def partial_evaluate(self, model):
+        antecedent = self.antecedent.partial_evaluate(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.partial_evaluate(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return self.antecedent.symbols() | self.consequent.symbols()
+
+    def expression(self, indices, operand):
+        return f"not {operand(self.antecedent)} or {operand(self.consequent)}"
 
 
 class Biconditional(Sentence):
@@ -211,10 +334,14 @@ class Biconditional(Sentence):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
+
+    def partial_evaluate(self, model):
+        left = self.left.partial_evaluate(model)
+        if left is None:
+            return None
+        right = self.right.partial_evaluate(model)
+        return None if right is None else left == right
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
@@ -222,42 +349,314 @@ class Biconditional(Sentence):
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        return self.left.symbols() | self.right.symbols()
 
+    def expression(self, indices, operand):
+        return f"(not {operand(self.left)}) == (not {operand(self.right)})"
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+class Frozen(Sentence):
+    """
+    Immutable sentence, built by freeze so that each distinct formula is one
+    shared object. Its symbols (a frozenset) and hash are computed once.
+    """
+
+    def seal(self):
+        """Caches the symbols and hash, after which the sentence cannot change."""
+        self._symbols = frozenset(super().symbols())
+        self._hash = super().__hash__()
 
-        # If model has an assignment for each symbol
-        if not symbols:
+    def __setattr__(self, name, value):
+        if "_hash" in self.__dict__:
+            raise AttributeError("frozen sentences are immutable")
+        super().__setattr__(name, value)
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+    def __eq__(self, other):
+        # freeze makes equal sentences the same object, but the constructors are
+        # public too, so anything else is compared by structure unless hashes differ
+        if self is other:
             return True
-        else:
+        if isinstance(other, Frozen) and self._hash != other._hash:
+            return False
+        return super().__eq__(other)
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+    def __hash__(self):
+        return self._hash
+
+    def symbols(self):
+        return self._symbols
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+class FrozenSymbol(Frozen, Symbol):
+    def __init__(self, name):
+        Symbol.__init__(self, name)
+        self.seal()
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+class FrozenNot(Frozen, Not):
+    def __init__(self, operand):
+        Not.__init__(self, operand)
+        self.seal()
+
+
+class FrozenAnd(Frozen, And):
+    def __init__(self, *conjuncts):
+        And.__init__(self, *conjuncts)
+        self.conjuncts = tuple(self.conjuncts)
+        self.seal()
+
+    def add(self, conjunct):
+        raise TypeError("frozen sentences are immutable")
+
+
+class FrozenOr(Frozen, Or):
+    def __init__(self, *disjuncts):
+        Or.__init__(self, *disjuncts)
+        self.disjuncts = tuple(self.disjuncts)
+        self.seal()
+
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+class FrozenImplication(Frozen, Implication):
+    def __init__(self, antecedent, consequent):
+        Implication.__init__(self, antecedent, consequent)
+        self.seal()
+
+
+class FrozenBiconditional(Frozen, Biconditional):
+    def __init__(self, left, right):
+        Biconditional.__init__(self, left, right)
+        self.seal()
+
+
+# Frozen sentences by class and parts, holding each only while it is in use
+interned = weakref.WeakValueDictionary()
+
+
+def freeze(sentence):
+    """Returns the interned, immutable equivalent of a sentence, sharing every repeated subformula."""
+    if isinstance(sentence, Frozen):
+        return sentence
+    if isinstance(sentence, Symbol):
+        key = (FrozenSymbol, sentence.name)
+    elif isinstance(sentence, Not):
+        key = (FrozenNot, freeze(sentence.operand))
+    elif isinstance(sentence, And):
+        key = (FrozenAnd, *[freeze(conjunct) for conjunct in sentence.conjuncts])
+    elif isinstance(sentence, Or):
+        key = (FrozenOr, *[freeze(disjunct) for disjunct in sentence.disjuncts])
+    elif isinstance(sentence, Implication):
+        key = (FrozenImplication, freeze(sentence.antecedent), freeze(sentence.consequent))
+    elif isinstance(sentence, Biconditional):
+        key = (FrozenBiconditional, freeze(sentence.left), freeze(sentence.right))
+    else:
+        raise TypeError("must be a logical sentence")
+    frozen = interned.get(key)
+    if frozen is None:
+        frozen = key[0](*key[1:])
+        interned[key] = frozen
+    return frozen
+
+
+# Models (full or partial) visited by the last model check
+check_stats = {"models": 0}
+
+
+def symbol_counts(sentence, counts=None):
+    """Returns how many times each symbol name occurs in a sentence."""
+    counts = {} if counts is None else counts
+    if isinstance(sentence, Symbol):
+        counts[sentence.name] = counts.get(sentence.name, 0) + 1
+    elif isinstance(sentence, Not):
+        symbol_counts(sentence.operand, counts)
+    elif isinstance(sentence, And):
+        for conjunct in sentence.conjuncts:
+            symbol_counts(conjunct, counts)
+    elif isinstance(sentence, Or):
+        for disjunct in sentence.disjuncts:
+            symbol_counts(disjunct, counts)
+    elif isinstance(sentence, Implication):
+        symbol_counts(sentence.antecedent, counts)
+        symbol_counts(sentence.consequent, counts)
+    elif isinstance(sentence, Biconditional):
+        symbol_counts(sentence.left, counts)
+        symbol_counts(sentence.right, counts)
+    return counts
+
+
+def pruning_model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, assigning symbols one at a time
+    and cutting a branch as soon as the partial model decides it: when
+    knowledge is false, or query is true, in every completion.
+    """
+    counts = symbol_counts(query, symbol_counts(knowledge))
+    # The most frequent symbols decide the most subsentences
+    order = sorted(counts, key=lambda name: (-counts[name], name))
+    model = {}
+    check_stats["models"] = 0
+
+    def check_all(index):
+        """Checks if knowledge base entails query in every completion of model."""
+        check_stats["models"] += 1
+        known = knowledge.partial_evaluate(model)
+        if known is False:
+            return True
+        answer = query.partial_evaluate(model)
+        if answer is not None and (answer or known):
+            # Query holds in every completion, or fails in one where knowledge holds
+            return answer
+
+        # Both are decided once every symbol is assigned
+        p = order[index]
+        model[p] = True
+        entailed = check_all(index + 1)
+        if entailed:
+            model[p] = False
+            entailed = check_all(index + 1)
+        del model[p]
+        return entailed
+
+    return check_all(0)
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
+
+    # Get all symbols in both knowledge and query
+    symbols = knowledge.symbols() | query.symbols()
+
+    # Enumerating 2^n models is hopeless for large n, but a SAT solver can refute knowledge and not query
+    if len(symbols) > SAT_SYMBOLS:
+        import sat
+        return sat.model_check(knowledge, query)
+
+    # Compile both sentences over int models, where bit i is the truth of the i-th symbol
+    symbols = sorted(symbols)
+    knowledge = knowledge.compile(symbols)
+    query = query.compile(symbols)
+
+    # Check that query is true in every model where knowledge is true
+    for model in range(1 << len(symbols)):
+        if knowledge(model) and not query(model):
+            check_stats["models"] = model + 1
+            return False
+    check_stats["models"] = 1 << len(symbols)
+    return True
+
+
+class KnowledgeBase():
+    """
+    Entailment session answering many queries against one knowledge base.
+
+    While the knowledge has at most MODEL_LIMIT models over at most 64
+    symbols, they are enumerated once and packed into an array of ints, where
+    bit i is the truth of self.symbols[i]: tell filters the stored models and
+    ask checks a query against them, so no query enumerates models again.
+    Past that, the knowledge goes into an incremental SAT solver instead, and
+    ask looks for a model of the knowledge where the query is false.
+    """
+
+    def __init__(self, knowledge=None):
+        self.knowledge = And()
+        self.symbols = []
+        # The empty knowledge base has one model, assigning nothing
+        self.models = array("Q", [0])
+        # Set up once the models are no longer kept
+        self.cnf = None
+        self.solver = None
+        if knowledge is not None:
+            self.tell(knowledge)
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge, keeping only the models where it holds."""
+        Sentence.validate(sentence)
+        self.knowledge.add(sentence)
+        new = sorted(sentence.symbols() - set(self.symbols))
+        count = len(self.symbols)
+        self.symbols.extend(new)
+
+        if self.models is not None and len(self.symbols) <= 64:
+            self.models = self.extend(sentence, count, len(new))
+            if self.models is not None:
+                return
+
+        self.models = None
+        if self.solver is None:
+            import sat
+            self.cnf = sat.CNF()
+            self.solver = sat.Solver()
+            sentence = self.knowledge
+        self.cnf.add(sentence)
+        self.flush()
+
+    def extend(self, sentence, count, new):
+        """
+        Returns the stored models extended over the new symbols from index
+        count on and filtered by sentence, or None past MODEL_LIMIT models.
+        """
+        # Too many models to extend with the new symbols one by one: solve for them instead
+        if len(self.models) << new > 1 << SAT_SYMBOLS:
+            return self.solve()
+
+        check = sentence.compile(self.symbols)
+        extensions = [extension << count for extension in range(1 << new)]
+        models = array("Q")
+        for model in self.models:
+            for extension in extensions:
+                if check(model | extension):
+                    if len(models) == MODEL_LIMIT:
+                        return None
+                    models.append(model | extension)
+        return models
+
+    def solve(self):
+        """
+        Enumerates the models of the knowledge with the SAT solver, blocking
+        each one found. Returns None once there are more than MODEL_LIMIT.
+        """
+        import sat
+        cnf = sat.CNF()
+        cnf.add(self.knowledge)
+        variables = [cnf.variable(name) for name in self.symbols]
+        solver = sat.Solver(cnf.variable_count(), cnf.clauses)
+        models = array("Q")
+        while solver.solve():
+            if len(models) == MODEL_LIMIT:
+                return None
+            model = 0
+            for i, variable in enumerate(variables):
+                if solver.model[variable]:
+                    model |= 1 << i
+            models.append(model)
+            solver.add_clause([-variable if model >> i & 1 else variable
+                               for i, variable in enumerate(variables)])
+        return models
+
+    def flush(self):
+        """Moves the clauses built up in the CNF into the solver."""
+        for clause in self.cnf.clauses:
+            self.solver.add_clause(clause)
+        self.cnf.clauses.clear()
+
+    def ask(self, query):
+        """Checks if the knowledge entails query, which may mention symbols the knowledge does not."""
+        if self.models is None:
+            # Entailed if no model of the knowledge makes the query false
+            literal = self.cnf.literal(query)
+            self.flush()
+            return not self.solver.solve([-literal])
+
+        new = sorted(query.symbols() - set(self.symbols))
+        # Too many extensions to check the query against: look for a counter-model instead
+        if len(self.models) << len(new) > 1 << SAT_SYMBOLS:
+            import sat
+            cnf = sat.CNF()
+            cnf.add(self.knowledge)
+            literal = cnf.literal(query)
+            solver = sat.Solver(cnf.variable_count(), cnf.clauses)
+            return not solver.solve([-literal])
+
+        symbols = self.symbols + new
+        check = query.compile(symbols)
+        extensions = [extension << len(self.symbols) for extension in range(1 << len(new))]
+        return all(check(model | extension) for model in self.models for extension in extensions)
@@ -74,8 +74,10 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            # Enumerate the puzzle's models once for all the queries
+            session = KnowledgeBase(knowledge)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if session.ask(symbol):
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,368 @@
+"""
+CNF conversion and a CDCL SAT solver for logic.py sentences.
+
+Sentences are turned into clauses with the Tseitin transformation: every
+connective gets a fresh variable defined by a few clauses, so the CNF grows
+linearly with the sentence. Literals are nonzero ints, -v being the negation
+of variable v.
+
+The solver does unit propagation with two watched literals per clause,
+learns a first-UIP clause from every conflict, backjumps, picks variables by
+activity (VSIDS) with saved phases, and restarts geometrically.
+"""
+
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Conflicts before the first restart, and the growth of the limit
+RESTART_FIRST = 100
+RESTART_GROWTH = 1.5
+
+# Decay of variable activities per conflict
+ACTIVITY_DECAY = 0.95
+
+
+class CNF():
+    """Clauses over integer variables, built from sentences by the Tseitin transformation."""
+
+    def __init__(self):
+        self.variables = {}
+        self.names = [None]
+        self.clauses = []
+        self.literals = {}
+        self.true = None
+
+    def variable(self, name=None):
+        """Returns the variable of a symbol name, or a new auxiliary variable for None."""
+        if name is not None and name in self.variables:
+            return self.variables[name]
+        variable = len(self.names)
+        self.names.append(name)
+        if name is not None:
+            self.variables[name] = variable
+        return variable
+
+    def constant(self, value):
+        """Returns a literal that is always value."""
+        if self.true is None:
+            self.true = self.variable()
+            self.clauses.append([self.true])
+        return self.true if value else -self.true
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to sentence, adding the clauses that define it."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, (And, Or)):
+            conjunction = isinstance(sentence, And)
+            parts = [self.literal(part) for part in
+                     (sentence.conjuncts if conjunction else sentence.disjuncts)]
+            if not parts:
+                return self.constant(conjunction)
+            if len(parts) == 1:
+                return parts[0]
+            # An Or is a negated And of the negated parts
+            sign = 1 if conjunction else -1
+            parts = [sign * part for part in parts]
+            literal = self.variable()
+            for part in parts:
+                self.clauses.append([-literal, part])
+            self.clauses.append([literal] + [-part for part in parts])
+            literal *= sign
+        elif isinstance(sentence, Implication):
+            return self.literal(Or(Not(sentence.antecedent), sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.variable()
+            self.clauses.extend([[-literal, -left, right], [-literal, left, -right],
+                                 [literal, left, right], [literal, -left, -right]])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.literals[sentence] = literal
+        return literal
+
+    def add(self, sentence):
+        """Asserts sentence, splitting top-level conjunctions and disjunctions of literals."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct) for disjunct in sentence.disjuncts])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def variable_count(self):
+        return len(self.names) - 1
+
+
+class Solver():
+    """Conflict-driven clause learning SAT solver."""
+
+    def __init__(self, variable_count=0, clauses=()):
+        self.clauses = []
+        self.watches = {}
+        self.values = [0]
+        # Literal -> 1 if true, -1 if false and 0 if unassigned, kept for both signs
+        self.truth = {}
+        self.levels = [0]
+        self.reasons = [None]
+        self.phases = [False]
+        self.activity = [0.0]
+        self.heap = []
+        self.increment = 1.0
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.ok = True
+        self.conflicts = 0
+        self.decisions = 0
+        self.model = None
+        self.add_variables(variable_count)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def add_variables(self, variable_count):
+        """Makes variables up to variable_count available."""
+        for variable in range(len(self.values), variable_count + 1):
+            self.values.append(0)
+            self.truth[variable] = self.truth[-variable] = 0
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.phases.append(False)
+            self.activity.append(0.0)
+            self.watches[variable] = []
+            self.watches[-variable] = []
+            heapq.heappush(self.heap, (0.0, variable))
+
+    def value(self, literal):
+        """Returns 1 if literal is true, -1 if false and 0 if unassigned."""
+        return self.truth[literal]
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.truth[literal] = 1
+        self.truth[-literal] = -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def add_clause(self, clause):
+        """Adds a clause between solves. Returns False once the clauses are unsatisfiable."""
+        if not self.ok:
+            return False
+        self.add_variables(max((abs(literal) for literal in clause), default=0))
+        literals = []
+        for literal in dict.fromkeys(clause):
+            if -literal in literals or self.value(literal) == 1:
+                # Tautologies and clauses already satisfied add nothing
+                return True
+            if self.value(literal) == 0:
+                literals.append(literal)
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(literals)
+        return self.ok
+
+    def attach(self, clause):
+        """Stores a clause watching its first two literals. Returns its index."""
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def propagate(self):
+        """Assigns every unit literal. Returns the index of a conflicting clause, or None."""
+        truth = self.truth
+        clauses = self.clauses
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            kept = []
+            for position, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if truth[first] == 1:
+                    kept.append(index)
+                    continue
+                # Move the watch to any literal that is not false
+                for k in range(2, len(clause)):
+                    if truth[clause[k]] != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if truth[first] == -1:
+                        kept.extend(watching[position + 1:])
+                        self.watches[false] = kept
+                        return index
+                    self.assign(first, index)
+            watches[false] = kept
+        return None
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in range(1, len(self.values))
+                         if not self.values[v]]
+            heapq.heapify(self.heap)
+        elif not self.values[variable]:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def analyze(self, conflict):
+        """
+        Derives the first-UIP clause from a conflict. Returns the clause,
+        with its asserting literal first, and the level to backjump to.
+        """
+        level = len(self.limits)
+        learnt = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in (clause if literal is None else clause[1:]):
+                variable = abs(q)
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            # Walk back to the latest literal of the conflict at this level
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if not pending:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learnt[0] = -literal
+
+        if len(learnt) == 1:
+            return learnt, 0
+        # Watch the literal of the highest remaining level second
+        deepest = max(range(1, len(learnt)), key=lambda i: self.levels[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def backtrack(self, level):
+        """Undoes every assignment above level."""
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            variable = abs(literal)
+            self.phases[variable] = literal > 0
+            self.values[variable] = 0
+            self.truth[variable] = self.truth[-variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity, or None."""
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if not self.values[variable]:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every assumption
+        literal true, leaving a variable -> bool dict in self.model.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.add_variables(max((abs(literal) for literal in assumptions), default=0))
+        restart = RESTART_FIRST
+        conflicts = 0
+        try:
+            while True:
+                conflict = self.propagate()
+                if conflict is not None:
+                    self.conflicts += 1
+                    conflicts += 1
+                    if not self.limits:
+                        self.ok = False
+                        return False
+                    learnt, level = self.analyze(conflict)
+                    self.backtrack(level)
+                    if len(learnt) == 1:
+                        self.assign(learnt[0], None)
+                    else:
+                        self.assign(learnt[0], self.attach(learnt))
+                    self.increment /= ACTIVITY_DECAY
+                    continue
+
+                if conflicts >= restart:
+                    conflicts = 0
+                    restart *= RESTART_GROWTH
+                    self.backtrack(0)
+                    continue
+
+                # Assumptions are the first decisions, one level each
+                literal = None
+                while len(self.limits) < len(assumptions):
+                    assumption = assumptions[len(self.limits)]
+                    if self.value(assumption) == -1:
+                        return False
+                    self.limits.append(len(self.trail))
+                    if self.value(assumption) == 0:
+                        literal = assumption
+                        break
+                if literal is None:
+                    variable = self.decide()
+                    if variable is None:
+                        self.model = {v: self.values[v] > 0 for v in range(1, len(self.values))}
+                        return True
+                    self.decisions += 1
+                    self.limits.append(len(self.trail))
+                    literal = variable if self.phases[variable] else -variable
+                self.assign(literal, None)
+        finally:
+            self.backtrack(0)
+
+
+def satisfiable(sentence):
+    """Returns a model of sentence as a symbol name -> bool dict, or None if there is none."""
+    cnf = CNF()
+    cnf.add(sentence)
+    solver = Solver(cnf.variable_count(), cnf.clauses)
+    if not solver.solve():
+        return None
+    return {name: solver.model[variable] for name, variable in cnf.variables.items()}
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query: knowledge and not query must be unsatisfiable."""
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return not Solver(cnf.variable_count(), cnf.clauses).solve()
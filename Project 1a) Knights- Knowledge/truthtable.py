@@ -0,0 +1,98 @@
+"""
+Vectorized truth-table entailment with NumPy.
+
+Every model of n symbols is one bit: model number k assigns symbol i the
+value of bit i of k. Each symbol is then a packed column of 2^n bits, 64
+models per uint64 word, and a sentence is evaluated for all models at once
+with bitwise array operations. Columns are built and evaluated one chunk of
+2^CHUNK_BITS models at a time, so memory stays bounded however many symbols
+there are; knowledge entails query if no chunk has a model of knowledge
+where query is false.
+
+Suited to up to about 26 symbols; beyond that use sat.py.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("truthtable.py needs NumPy; install it with: pip install numpy")
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Models evaluated per chunk, as a power of two (2^20 models = 128 KiB per column)
+CHUNK_BITS = 20
+
+# Every bit of a word set
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+ZERO = np.uint64(0)
+
+# PATTERNS[i] is the column of symbol i within one 64-model word
+PATTERNS = [np.uint64(sum(1 << k for k in range(64) if k >> i & 1)) for i in range(6)]
+
+
+def columns(symbols, chunk, chunk_bits):
+    """Returns the packed column of every symbol name over models of one chunk."""
+    words = 1 << (chunk_bits - 6)
+    index = np.arange(words, dtype=np.uint64)
+    result = {}
+    for i, name in enumerate(symbols):
+        if i < 6:
+            result[name] = np.full(words, PATTERNS[i])
+        elif i < chunk_bits:
+            # Whole words alternate in runs of 2^(i - 6)
+            result[name] = np.where((index >> np.uint64(i - 6)) & np.uint64(1), ONES, ZERO)
+        else:
+            # Constant across the chunk
+            result[name] = np.full(words, ONES if chunk >> (i - chunk_bits) & 1 else ZERO)
+    return result
+
+
+def evaluate(sentence, columns, words, memo):
+    """
+    Returns the packed column of a sentence's truth over words words, given
+    the symbol columns. Shared subsentences are evaluated once per memo.
+    """
+    key = id(sentence)
+    if key in memo:
+        return memo[key]
+    if isinstance(sentence, Symbol):
+        value = columns[sentence.name]
+    elif isinstance(sentence, Not):
+        value = ~evaluate(sentence.operand, columns, words, memo)
+    elif isinstance(sentence, And):
+        value = np.full(words, ONES)
+        for conjunct in sentence.conjuncts:
+            value &= evaluate(conjunct, columns, words, memo)
+    elif isinstance(sentence, Or):
+        value = np.full(words, ZERO)
+        for disjunct in sentence.disjuncts:
+            value |= evaluate(disjunct, columns, words, memo)
+    elif isinstance(sentence, Implication):
+        value = (~evaluate(sentence.antecedent, columns, words, memo)
+                 | evaluate(sentence.consequent, columns, words, memo))
+    elif isinstance(sentence, Biconditional):
+        value = ~(evaluate(sentence.left, columns, words, memo)
+                  ^ evaluate(sentence.right, columns, words, memo))
+    else:
+        raise TypeError("must be a logical sentence")
+    memo[key] = value
+    return value
+
+
+def model_check(knowledge, query, chunk_bits=CHUNK_BITS):
+    """Checks if knowledge base entails query, evaluating all models in packed chunks."""
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    chunk_bits = max(6, min(len(symbols), chunk_bits))
+
+    # With fewer than 64 models, only the low bits of the single word are models
+    valid = ONES if len(symbols) >= 6 else np.uint64((1 << (1 << len(symbols))) - 1)
+
+    for chunk in range(1 << max(len(symbols) - chunk_bits, 0)):
+        chunk_columns = columns(symbols, chunk, chunk_bits)
+        words = 1 << (chunk_bits - 6)
+        memo = {}
+        counterexamples = (evaluate(knowledge, chunk_columns, words, memo)
+                           & ~evaluate(query, chunk_columns, words, memo) & valid)
+        if counterexamples.any():
+            return False
+    return True
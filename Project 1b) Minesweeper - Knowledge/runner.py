@@ -1,6 +1,8 @@
 import pygame
 import sys
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from minesweeper import Minesweeper, MinesweeperAI
 
@@ -23,6 +25,7 @@ OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
 smallFont = pygame.font.Font(OPEN_SANS, 20)
 mediumFont = pygame.font.Font(OPEN_SANS, 28)
 largeFont = pygame.font.Font(OPEN_SANS, 40)
+tinyFont = pygame.font.Font(OPEN_SANS, 14)
 
 # Compute board size
 BOARD_PADDING = 20
@@ -41,6 +44,42 @@ mine = pygame.transform.scale(mine, (cell_size, cell_size))
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
 ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
 
+# The AI runs on a worker thread so the window keeps drawing. Every call on
+# ai goes through the worker, so its knowledge is only touched in order.
+worker = ThreadPoolExecutor(1)
+thinking = None
+# Knowledge updates in flight, checked every frame so their errors surface
+updates = []
+
+# Recent frame times in milliseconds, for the overlay
+frames = deque(maxlen=60)
+last_frame = time.perf_counter()
+
+
+def think(ai):
+    """Runs on the worker: returns the AI's next move and the mines it knows of."""
+    move = ai.make_safe_move()
+    if move is None:
+        move = ai.make_random_move()
+        if move is None:
+            print("No moves left to make.")
+        else:
+            print("No known safe moves, AI making random move.")
+    else:
+        print("AI making safe move.")
+    return move, ai.mines.copy()
+
+
+def draw_frame_time():
+    """Draws the frame time overlay in the bottom right corner."""
+    global last_frame
+    now = time.perf_counter()
+    frames.append((now - last_frame) * 1000)
+    last_frame = now
+    text = f"frame {frames[-1]:.1f} ms, max {max(frames):.1f} ms"
+    overlay = tinyFont.render(text, True, WHITE)
+    screen.blit(overlay, (width - overlay.get_width() - 5, height - overlay.get_height() - 5))
+
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
 flags = set()
@@ -95,6 +134,7 @@ while True:
                 instructions = False
                 time.sleep(0.3)
 
+        draw_frame_time()
         pygame.display.flip()
         continue
 
@@ -153,7 +193,7 @@ while True:
     screen.blit(buttonText, buttonRect)
 
     # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    text = "Lost" if lost else "Won" if game.mines == flags else "Thinking…" if thinking is not None else ""
     text = mediumFont.render(text, True, WHITE)
     textRect = text.get_rect()
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
@@ -161,7 +201,21 @@ while True:
 
     move = None
 
-    left, _, right = pygame.mouse.get_pressed()
+    # Raise any error the AI hit while adding knowledge
+    for update in [update for update in updates if update.done()]:
+        update.result()
+        updates.remove(update)
+
+    # Check for the AI's move. Its frame takes no input, so the move is made and
+    # its knowledge queued before a held AI button can ask the worker again
+    if thinking is not None and thinking.done():
+        move, mines = thinking.result()
+        if move is None:
+            flags = mines
+        thinking = None
+        left = right = 0
+    else:
+        left, _, right = pygame.mouse.get_pressed()
 
     # Check for a right-click to toggle flagging
     if right == 1 and not lost:
@@ -178,22 +232,18 @@ while True:
     elif left == 1:
         mouse = pygame.mouse.get_pos()
 
-        # If AI button clicked, make an AI move
+        # If AI button clicked, start thinking about an AI move
         if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
-                else:
-                    print("No known safe moves, AI making random move.")
-            else:
-                print("AI making safe move.")
+            if thinking is None:
+                thinking = worker.submit(think, ai)
             time.sleep(0.2)
 
-        # Reset game state
+        # Reset game state, dropping the old AI and whatever it was doing
         elif resetButton.collidepoint(mouse):
+            worker.shutdown(wait=False, cancel_futures=True)
+            worker = ThreadPoolExecutor(1)
+            thinking = None
+            updates = []
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
             ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
             revealed = set()
@@ -201,8 +251,8 @@ while True:
             lost = False
             continue
 
-        # User-made move
-        elif not lost:
+        # User-made move, unless the AI is about to move
+        elif not lost and thinking is None:
             for i in range(HEIGHT):
                 for j in range(WIDTH):
                     if (cells[i][j].collidepoint(mouse)
@@ -217,6 +267,7 @@ while True:
         else:
             nearby = game.nearby_mines(move)
             revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            updates.append(worker.submit(ai.add_knowledge, move, nearby))
 
+    draw_frame_time()
     pygame.display.flip()